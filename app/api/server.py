@@ -0,0 +1,693 @@
+"""HTTP JSON API поверх AccountService, CategoryService и OperationService.
+
+Сервер на asyncio без внешних зависимостей: цикл событий только разбирает
+HTTP и пишет ответы, а вся работа с БД, сборка JSON и сжатие идут в
+ограниченном пуле потоков (у каждого потока свое соединение SQLite).
+Когда пул и очередь к нему заполнены, сервер сразу отвечает 503 вместо
+того, чтобы копить запросы.
+
+Запуск из корня репозитория:
+
+    python -m app.api.server [--host 127.0.0.1] [--port 8080] [--workers 4] [--database app/data/finance.db]
+
+Маршруты:
+
+    GET    /api/accounts                       список счетов (ETag)
+    POST   /api/accounts                       {"name", "balance", "currency"}
+    GET    /api/accounts/{id}
+    PATCH  /api/accounts/{id}                  {"name", "isActive"}
+    DELETE /api/accounts/{id}
+    GET    /api/accounts/{id}/balance?asOf=YYYY-MM-DD
+    GET    /api/categories?type=income|expense|transfer   (ETag)
+    POST   /api/categories                     {"name", "type"}
+    GET    /api/categories/{id}
+    GET    /api/operations?limit=&cursor=&accountId=&categoryId=&type=&dateFrom=&dateTo=
+    POST   /api/operations                     {"type", "amount", "accountId", "categoryId", "toAccountId", "date", "note"}
+    GET    /api/operations/search?q=&limit=&offset= (и те же фильтры)
+
+Суммы передаются строками, чтобы не терять точность Decimal.
+"""
+
+import argparse
+import asyncio
+import decimal
+import gzip
+import json
+import logging
+import re
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from app.db import database
+from app.models.account import Account
+from app.models.category import Category, OperationType
+from app.models.money import DEFAULT_CURRENCY, to_minor
+from app.models.operation import Operation
+from app.services.account_service import AccountService, accounts_cache
+from app.services.cache import TableCache
+from app.services.category_service import CategoryService, categories_cache
+from app.services.operation_service import DEFAULT_PAGE_SIZE, OperationService, PageCursor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+
+# Сколько запросов может ждать свободного потока сверх числа потоков;
+# остальные сразу получают 503 с Retry-After
+MAX_PENDING = 64
+RETRY_AFTER = 1  # секунды
+
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+KEEPALIVE_TIMEOUT = 15  # секунды простоя соединения между запросами
+
+# Мелкие ответы не сжимаются: заголовок gzip и работа CPU их не окупают
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+MAX_PAGE_SIZE = 1000
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+# Браузерный фронтенд (figma_design) работает с другого порта
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+    "Access-Control-Allow-Methods": "GET, POST, PATCH, DELETE, OPTIONS",
+    "Access-Control-Expose-Headers": "ETag",
+}
+
+
+class HttpError(Exception):
+    """Ошибка, которая отдается клиенту с заданным статусом."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass(slots=True)
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]  # имена в нижнем регистре
+    body: bytes = b""
+    params: Dict[str, str] = field(default_factory=dict)  # параметры из шаблона маршрута
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        return connection != "close"
+
+    def accepts_gzip(self) -> bool:
+        return any(
+            part.split(";")[0].strip().lower() == "gzip"
+            for part in self.headers.get("accept-encoding", "").split(",")
+        )
+
+    def json(self) -> dict:
+        try:
+            payload = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса — не JSON.")
+        if not isinstance(payload, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON-объектом.")
+        return payload
+
+
+@dataclass(slots=True)
+class Response:
+    status: int = HTTPStatus.OK
+    body: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def json_response(payload, status: int = HTTPStatus.OK, headers: Optional[Dict[str, str]] = None) -> Response:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(status, body, {"Content-Type": JSON_CONTENT_TYPE, **(headers or {})})
+
+
+def error_response(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return json_response({"error": message, "status": int(status)}, status, headers)
+
+
+def compress(request: Request, response: Response) -> Response:
+    """Сжимает тело gzip, если клиент это принимает и тело достаточно большое."""
+    if not response.body or "Content-Encoding" in response.headers:
+        return response
+    response.headers.setdefault("Vary", "Accept-Encoding")
+    if len(response.body) >= GZIP_MIN_SIZE and request.accepts_gzip():
+        response.body = gzip.compress(response.body, GZIP_LEVEL, mtime=0)
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def account_json(account: Account) -> dict:
+    return {
+        "id": account.id,
+        "name": account.name,
+        "balance": str(account.balance),
+        "currency": account.currency,
+        "isActive": account.is_active,
+    }
+
+
+def category_json(category: Category) -> dict:
+    return {"id": category.id, "name": category.name, "type": category.operation_type.value}
+
+
+def operation_json(operation: Operation) -> dict:
+    return {
+        "id": operation.id,
+        "type": operation.operation_type.value,
+        "amount": str(operation.amount),
+        "date": operation.operation_date.isoformat(),
+        "accountId": operation.account_id,
+        "toAccountId": operation.to_account_id,
+        "categoryId": operation.category_id,
+        "note": operation.notes,
+    }
+
+
+def encode_cursor(cursor: Optional[PageCursor]) -> Optional[str]:
+    if cursor is None:
+        return None
+    cursor_date, cursor_id = cursor
+    return f"{cursor_date.isoformat()}_{cursor_id}"
+
+
+def decode_cursor(value: Optional[str]) -> Optional[PageCursor]:
+    if not value:
+        return None
+    try:
+        cursor_date, cursor_id = value.split("_")
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Некорректный курсор: {value}")
+
+
+def _int_param(values: Dict[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    value = values.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: ожидается целое число.")
+
+
+def _date_param(values: Dict[str, str], name: str) -> Optional[date]:
+    value = values.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: ожидается дата в формате YYYY-MM-DD.")
+
+
+def _type_param(values: Dict[str, str], name: str = "type") -> Optional[OperationType]:
+    value = values.get(name)
+    if not value:
+        return None
+    try:
+        return OperationType(value)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: ожидается income, expense или transfer.")
+
+
+def _amount_param(values: dict, name: str = "amount") -> Decimal:
+    value = values.get(name)
+    if value in (None, ""):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Не задано поле {name}.")
+    try:
+        amount = Decimal(str(value))
+    except decimal.InvalidOperation:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: некорректная сумма.")
+    # Знак задает тип операции, поэтому сумма всегда положительна
+    if not amount.is_finite() or amount <= 0:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name}: сумма должна быть положительным числом.")
+    return amount
+
+
+def _limit_param(values: Dict[str, str]) -> int:
+    limit = _int_param(values, "limit", DEFAULT_PAGE_SIZE)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"limit: от 1 до {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def _required(payload: dict, name: str):
+    value = payload.get(name)
+    if value in (None, ""):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Не задано поле {name}.")
+    return value
+
+
+Handler = Callable[["FinanceApi", Request], Response]
+
+_ROUTES: List[Tuple[str, re.Pattern, Handler]] = []
+
+
+def route(method: str, path: str):
+    """Регистрирует обработчик FinanceApi для метода и шаблона пути вида /api/accounts/{id}."""
+    pattern = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", path) + "$")
+
+    def decorator(func: Handler) -> Handler:
+        _ROUTES.append((method, pattern, func))
+        return func
+    return decorator
+
+
+class FinanceApi:
+    """Обработчики маршрутов. Выполняются синхронно в потоках пула сервера.
+
+    Списки счетов и категорий отдаются с ETag, построенным по номеру
+    загрузки TableCache: пока таблица не менялась, повторный запрос с
+    If-None-Match получает 304 без тела, а сериализованное (и сжатое)
+    тело списка берется из кэша ответов и не собирается заново.
+    """
+
+    def __init__(self):
+        self.accounts = AccountService()
+        self.categories = CategoryService()
+        self.operations = OperationService()
+        # Номера загрузок TableCache начинаются заново после перезапуска,
+        # поэтому в ETag входит метка запуска сервера
+        self._boot = uuid.uuid4().hex[:8]
+        # ключ списка -> (номер загрузки кэша, ETag, тело, тело в gzip или None)
+        self._lists: Dict[str, Tuple[int, str, bytes, Optional[bytes]]] = {}
+        self._lists_lock = threading.Lock()
+
+    def handle(self, request: Request) -> Response:
+        """Находит маршрут, выполняет обработчик и переводит исключения в HTTP-ошибки."""
+        try:
+            if request.method == "OPTIONS":
+                return Response(HTTPStatus.NO_CONTENT)
+            allowed = []
+            for method, pattern, handler in _ROUTES:
+                match = pattern.match(request.path)
+                if match is None:
+                    continue
+                if method != request.method and not (method == "GET" and request.method == "HEAD"):
+                    allowed.append(method)
+                    continue
+                request.params = match.groupdict()
+                return compress(request, handler(self, request))
+            if allowed:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается.",
+                                {"Allow": ", ".join(allowed)})
+            raise HttpError(HTTPStatus.NOT_FOUND, "Маршрут не найден.")
+        except HttpError as error:
+            return error_response(error.status, error.message, error.headers)
+        except sqlite3.IntegrityError as error:
+            return error_response(HTTPStatus.CONFLICT, str(error))
+        except decimal.InvalidOperation:
+            return error_response(HTTPStatus.BAD_REQUEST, "Некорректная сумма.")
+        except ValueError as error:
+            return error_response(HTTPStatus.BAD_REQUEST, str(error))
+        except Exception:
+            logger.exception("%s %s", request.method, request.path)
+            return error_response(HTTPStatus.INTERNAL_SERVER_ERROR, "Внутренняя ошибка сервера.")
+
+    def _id(self, request: Request) -> int:
+        return _int_param(request.params, "id")
+
+    def _cached_list(self, request: Request, key: str, cache: TableCache, build: Callable[[list], list]) -> Response:
+        """Отдает список из TableCache с ETag; тело собирается один раз на загрузку таблицы.
+
+        Кэш таблицы перечитывается и после чужих изменений, не затронувших
+        список (data_version меняется от любой записи в БД), поэтому при
+        перечитывании тело сравнивается с прежним: если оно не изменилось,
+        ETag остается прежним и клиенты продолжают получать 304.
+        """
+        version, items = cache.versioned()
+        with self._lists_lock:
+            cached = self._lists.get(key)
+        if cached is None or cached[0] != version:
+            body = json_response(build(items)).body
+            if cached is not None and cached[2] == body:
+                cached = (version, cached[1], body, cached[3])
+            else:
+                cached = (version, f'"{key}-{self._boot}-{version}"', body, None)
+            with self._lists_lock:
+                self._lists[key] = cached
+        _, etag, body, gzipped = cached
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            if etag in tags or "*" in tags:
+                return Response(HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        headers.update({"Content-Type": JSON_CONTENT_TYPE, "Vary": "Accept-Encoding"})
+        if len(body) < GZIP_MIN_SIZE or not request.accepts_gzip():
+            return Response(HTTPStatus.OK, body, headers)
+        if gzipped is None:
+            gzipped = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            with self._lists_lock:
+                if self._lists.get(key, (None,))[0] == version:
+                    self._lists[key] = (version, etag, body, gzipped)
+        headers["Content-Encoding"] = "gzip"
+        return Response(HTTPStatus.OK, gzipped, headers)
+
+    # --- счета ---
+
+    @route("GET", "/api/accounts")
+    def list_accounts(self, request: Request) -> Response:
+        return self._cached_list(request, "accounts", accounts_cache,
+                                 lambda items: [account_json(account) for account in items])
+
+    @route("POST", "/api/accounts")
+    def create_account(self, request: Request) -> Response:
+        payload = request.json()
+        name = str(_required(payload, "name")).strip()
+        currency = payload.get("currency") or DEFAULT_CURRENCY
+        account = self.accounts.create_account(name, str(payload.get("balance", "0")), currency)
+        return json_response(account_json(account), HTTPStatus.CREATED, {"Location": f"/api/accounts/{account.id}"})
+
+    @route("GET", "/api/accounts/{id}")
+    def get_account(self, request: Request) -> Response:
+        account = self.accounts.get_account(self._id(request))
+        if account is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        return json_response(account_json(account))
+
+    @route("PATCH", "/api/accounts/{id}")
+    def update_account(self, request: Request) -> Response:
+        account_id = self._id(request)
+        payload = request.json()
+        account = self.accounts.get_account(account_id)
+        if account is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        name = str(payload.get("name", account.name)).strip()
+        is_active = payload.get("isActive", account.is_active)
+        if not name or not isinstance(is_active, bool):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "name — непустая строка, isActive — true или false.")
+        updated = self.accounts.update_account(account_id, name, is_active)
+        if updated is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        return json_response(account_json(updated))
+
+    @route("DELETE", "/api/accounts/{id}")
+    def delete_account(self, request: Request) -> Response:
+        try:
+            deleted = self.accounts.delete_account(self._id(request))
+        except ValueError as error:
+            raise HttpError(HTTPStatus.CONFLICT, str(error))
+        if not deleted:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        return Response(HTTPStatus.NO_CONTENT)
+
+    @route("GET", "/api/accounts/{id}/balance")
+    def get_balance(self, request: Request) -> Response:
+        account_id = self._id(request)
+        as_of = _date_param(request.query, "asOf") or date.today()
+        balance = self.accounts.get_balance_as_of(account_id, as_of)
+        if balance is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        return json_response({"accountId": account_id, "asOf": as_of.isoformat(), "balance": str(balance)})
+
+    # --- категории ---
+
+    @route("GET", "/api/categories")
+    def list_categories(self, request: Request) -> Response:
+        operation_type = _type_param(request.query)
+        if operation_type is None:
+            return self._cached_list(request, "categories", categories_cache,
+                                     lambda items: [category_json(category) for category in items])
+        return self._cached_list(
+            request, f"categories-{operation_type.value}", categories_cache,
+            lambda items: [category_json(category) for category in items if category.operation_type == operation_type]
+        )
+
+    @route("POST", "/api/categories")
+    def create_category(self, request: Request) -> Response:
+        payload = request.json()
+        name = str(_required(payload, "name")).strip()
+        operation_type = _type_param(payload)
+        if operation_type is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Не задано поле type.")
+        category = self.categories.create_category(name, operation_type)
+        return json_response(category_json(category), HTTPStatus.CREATED,
+                             {"Location": f"/api/categories/{category.id}"})
+
+    @route("GET", "/api/categories/{id}")
+    def get_category(self, request: Request) -> Response:
+        category = self.categories.get_category(self._id(request))
+        if category is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Категория не найдена.")
+        return json_response(category_json(category))
+
+    # --- операции ---
+
+    def _filters(self, values: Dict[str, str]) -> dict:
+        return {
+            "account_id": _int_param(values, "accountId"),
+            "category_id": _int_param(values, "categoryId"),
+            "operation_type": _type_param(values),
+            "date_from": _date_param(values, "dateFrom"),
+            "date_to": _date_param(values, "dateTo"),
+        }
+
+    @route("GET", "/api/operations")
+    def list_operations(self, request: Request) -> Response:
+        operations, next_cursor = self.operations.get_operations_page(
+            decode_cursor(request.query.get("cursor")), _limit_param(request.query), **self._filters(request.query)
+        )
+        return json_response({
+            "items": [operation_json(operation) for operation in operations],
+            "nextCursor": encode_cursor(next_cursor),
+        })
+
+    @route("POST", "/api/operations")
+    def create_operation(self, request: Request) -> Response:
+        payload = request.json()
+        operation_type = _type_param(payload)
+        if operation_type is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Не задано поле type.")
+        amount = _amount_param(payload)
+        account_id = _int_param(payload, "accountId")
+        if account_id is None:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Не задано поле accountId.")
+        account = self.accounts.get_account(account_id)
+        if account is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Счет не найден.")
+        if to_minor(amount, account.currency) <= 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"amount: меньше минимальной единицы валюты {account.currency}.")
+        operation_date = _date_param(payload, "date")
+        note = str(payload.get("note") or "")
+        category_id = _int_param(payload, "categoryId")
+        if operation_type == OperationType.TRANSFER:
+            to_account_id = _int_param(payload, "toAccountId")
+            if to_account_id is None or self.accounts.get_account(to_account_id) is None:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Для перевода нужен существующий счет toAccountId.")
+            operation = self.operations.transfer(amount, account_id, to_account_id, note, operation_date, category_id)
+        else:
+            if category_id is None:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Не задано поле categoryId.")
+            operation = self.operations.add_operation(
+                amount, note, account_id, category_id, operation_type, operation_date
+            )
+        return json_response(operation_json(operation), HTTPStatus.CREATED)
+
+    @route("GET", "/api/operations/search")
+    def search_operations(self, request: Request) -> Response:
+        query = request.query.get("q", "").strip()
+        if not query:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Не задан параметр q.")
+        offset = _int_param(request.query, "offset", 0)
+        if offset < 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "offset не может быть отрицательным.")
+        results = self.operations.search(
+            query, limit=_limit_param(request.query), offset=offset, **self._filters(request.query)
+        )
+        return json_response({"items": [
+            {**operation_json(result.operation), "snippet": result.snippet, "rank": result.rank}
+            for result in results
+        ]})
+
+
+class ApiServer:
+    """HTTP/1.1-сервер на asyncio с keep-alive и ограниченным пулом потоков для БД.
+
+    workers — число потоков (и соединений SQLite), max_pending — сколько
+    запросов может ждать свободный поток. Все сверх этого получает 503.
+    """
+
+    def __init__(
+        self,
+        api: Optional[FinanceApi] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = MAX_PENDING,
+    ):
+        self.api = api or FinanceApi()
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.capacity = workers + max_pending
+        self.in_flight = 0  # меняется только в потоке цикла событий
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_SIZE)
+        # Для port=0 порт выбирает ОС
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Соединения SQLite потоков пула закрываются вместе с ConnectionManager
+        self._executor.shutdown(wait=True)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as error:
+                    response = error_response(error.status, error.message, error.headers)
+                    writer.write(self._serialize(response, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                response = await self._dispatch(request)
+                writer.write(self._serialize(response, request.keep_alive, head=request.method == "HEAD"))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """Читает один запрос; None — клиент закрыл соединение между запросами."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as error:
+            if not error.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Слишком большие заголовки.")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректная строка запроса.")
+        if not version.startswith("HTTP/1."):
+            raise HttpError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, "Поддерживается только HTTP/1.x.")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+            headers["connection"] = "close"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(HTTPStatus.NOT_IMPLEMENTED, "Chunked-тело не поддерживается, укажите Content-Length.")
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length.")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большое тело запроса.")
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path.rstrip("/") or "/", dict(parse_qsl(url.query)), headers, body)
+
+    async def _dispatch(self, request: Request) -> Response:
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            return error_response(HTTPStatus.SERVICE_UNAVAILABLE, "Сервер перегружен, повторите позже.",
+                                  {"Retry-After": str(RETRY_AFTER)})
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.api.handle, request)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _serialize(response: Response, keep_alive: bool, head: bool = False) -> bytes:
+        status = HTTPStatus(response.status)
+        headers = {**CORS_HEADERS, **response.headers}
+        if status != HTTPStatus.NOT_MODIFIED and status != HTTPStatus.NO_CONTENT:
+            headers["Content-Length"] = str(len(response.body))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        head_bytes = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if head or status in (HTTPStatus.NOT_MODIFIED, HTTPStatus.NO_CONTENT):
+            return head_bytes
+        return head_bytes + response.body
+
+
+async def serve(host: str, port: int, workers: int, max_pending: int = MAX_PENDING):
+    server = ApiServer(host=host, port=port, workers=workers, max_pending=max_pending)
+    await server.start()
+    print(f"API: http://{server.host}:{server.port}/api (потоков БД: {workers})", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 — выбрать свободный порт")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="потоков для работы с БД")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING, help="запросов в очереди до 503")
+    parser.add_argument("--database", default=database.DATABASE_FILE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    database.set_database(args.database)
+    database.init_database()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.get_connection_manager().close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,153 @@
 
+import os
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app.db.migrations import apply_migrations
+from app.db.profiler import ProfiledConnection
 
 DATABASE_FILE = "app/data/finance.db"
 
-def get_db_connection():
-    """Создает и возвращает соединение с базой данных."""
-    conn = sqlite3.connect(DATABASE_FILE)
-    conn.row_factory = sqlite3.Row # Позволяет обращаться к колонкам по имени
-    return conn
+# Прагмы, которые выставляются один раз при открытии соединения
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",      # ~20 МБ страничного кэша
+    "PRAGMA mmap_size = 268435456",    # 256 МБ
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Размер кэша подготовленных выражений на одно соединение
+STATEMENT_CACHE_SIZE = 256
+
+# Повторные попытки захвата блокировки записи сверх busy_timeout
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05  # секунды, удваивается с каждой попыткой
+
+
+class ConnectionManager:
+    """Хранит по одному долгоживущему соединению на поток.
+
+    Соединение открывается при первом обращении из потока, настраивается
+    прагмами один раз и переиспользуется всеми сервисами. Соединения
+    работают в режиме autocommit: транзакции открываются явно через
+    transaction().
+    """
+
+    def __init__(self, database: str = DATABASE_FILE):
+        self.database = database
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.database)
+        if directory and self.database != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self.database,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            uri=True, # URI-имена нужны для ATTACH архивов только для чтения (mode=ro)
+            factory=ProfiledConnection, # Замеры запросов, когда включен профилировщик
+        )
+        conn.row_factory = sqlite3.Row # Позволяет обращаться к колонкам по имени
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Возвращает соединение текущего потока, открывая его при необходимости."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def close_all(self):
+        """Закрывает все открытые соединения (например, при завершении приложения)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Соединение создано в другом потоке — оно закроется вместе с ним
+                pass
+        self._local = threading.local()
+
+
+_manager = ConnectionManager()
+
 
-def create_tables():
-    """Создает таблицы в базе данных, если они еще не созданы."""
+def get_connection_manager() -> ConnectionManager:
+    """Возвращает глобальный менеджер соединений."""
+    return _manager
+
+
+def set_database(database: str) -> ConnectionManager:
+    """Переключает приложение на другой файл БД (тесты, бенчмарки)."""
+    global _manager
+    _manager.close_all()
+    _manager = ConnectionManager(database)
+    return _manager
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Возвращает переиспользуемое соединение с базой данных для текущего потока.
+
+    Соединение принадлежит менеджеру — закрывать его не нужно.
+    """
+    return _manager.connection()
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        # Расширенные коды (например, SQLITE_BUSY_SNAPSHOT) сводим к основному
+        return (code & 0xFF) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+@contextmanager
+def transaction():
+    """Открывает транзакцию записи на соединении потока.
+
+    Используется BEGIN IMMEDIATE: блокировка записи берется сразу, поэтому
+    в режиме WAL последующие операторы транзакции уже не получают
+    SQLITE_BUSY. Если БД занята дольше busy_timeout, захват повторяется
+    до BUSY_RETRIES раз с экспоненциальной паузой. Фиксирует изменения при
+    успешном выходе и откатывает их при исключении.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Таблица счетов
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            balance TEXT NOT NULL,
-            is_active BOOLEAN NOT NULL DEFAULT 1
-        );
-    """)
-
-    # Таблица категорий
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        );
-    """)
-
-    # Таблица операций
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS operations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            amount TEXT NOT NULL,
-            operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense')),
-            operation_date TEXT NOT NULL,
-            category_id INTEGER NOT NULL,
-            account_id INTEGER NOT NULL,
-            notes TEXT,
-            FOREIGN KEY (category_id) REFERENCES categories (id),
-            FOREIGN KEY (account_id) REFERENCES accounts (id)
-        );
-    """)
-
-    conn.commit()
-    conn.close()
-    print("Таблицы успешно созданы (или уже существовали).")
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == BUSY_RETRIES:
+                raise
+            delay = BUSY_BACKOFF * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def init_database() -> int:
+    """Приводит схему БД к актуальной версии и возвращает номер версии.
+
+    При актуальной схеме выполняется только чтение PRAGMA user_version.
+    """
+    return apply_migrations(get_db_connection())
@@ -0,0 +1,567 @@
+
+import sqlite3
+from typing import Callable, List, Tuple
+
+# Зарегистрированные миграции: (номер версии, описание, функция)
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+
+def migration(version: int, description: str):
+    """Регистрирует функцию как миграцию схемы до версии version."""
+    def decorator(func):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Миграции должны идти по возрастанию версий: {version}")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str, select_sql: str):
+    """Пересоздает таблицу с новой схемой внутри текущей транзакции.
+
+    create_sql должен содержать «{table}» вместо имени таблицы; select_sql
+    выбирает данные из старой таблицы в порядке колонок новой. Индексы и
+    триггеры старой таблицы удаляются вместе с ней — миграция создает их заново.
+    """
+    new_table = f"{table}__new"
+    conn.execute(create_sql.format(table=new_table))
+    conn.execute(f"INSERT INTO {new_table} {select_sql}")
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    if sequence is not None:
+        # Сохраняем счетчик AUTOINCREMENT, чтобы id удаленных строк не переиспользовались
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table)
+        )
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции и возвращает итоговую версию схемы.
+
+    Если версия в PRAGMA user_version актуальна, никакой DDL не выполняется.
+    Каждая миграция идет в своей транзакции вместе с повышением user_version,
+    поэтому прерванный запуск безопасно продолжается со следующей версии.
+    """
+    version = current_version(conn)
+    if version >= latest_version():
+        return version
+
+    for target, description, func in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            func(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        version = target
+    return version
+
+
+@migration(1, "Базовая схема: счета, категории, операции")
+def _initial_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            balance TEXT NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT 1
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount TEXT NOT NULL,
+            operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense')),
+            operation_date TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            notes TEXT,
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+    """)
+
+
+OPERATION_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_operations_date ON operations (operation_date)",
+    "CREATE INDEX IF NOT EXISTS idx_operations_account_date ON operations (account_id, operation_date)",
+    "CREATE INDEX IF NOT EXISTS idx_operations_category_date ON operations (category_id, operation_date)",
+)
+
+
+@migration(2, "Тип операции у категорий, переводы в операциях, индексы")
+def _category_type_and_transfers(conn):
+    if "operation_type" in table_columns(conn, "categories"):
+        category_type = "operation_type"
+    else:
+        category_type = "'expense'"
+    rebuild_table(conn, "categories", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            operation_type TEXT NOT NULL DEFAULT 'expense'
+                CHECK(operation_type IN ('income', 'expense', 'transfer'))
+        )
+    """, f"SELECT id, name, {category_type} FROM categories")
+
+    rebuild_table(conn, "operations", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount TEXT NOT NULL,
+            operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense', 'transfer')),
+            operation_date TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            notes TEXT,
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+    """, """SELECT id, amount, operation_type, operation_date, category_id, account_id, notes
+            FROM operations""")
+    for statement in OPERATION_INDEXES:
+        conn.execute(statement)
+
+
+@migration(3, "Суммы в целых минорных единицах и валюта счета")
+def _integer_minor_units(conn):
+    from app.models.money import DEFAULT_CURRENCY, to_minor
+
+    # Конвертация строк идет через Decimal внутри одного INSERT ... SELECT
+    conn.create_function("to_minor_units", 2, to_minor, deterministic=True)
+    try:
+        rebuild_table(conn, "accounts", """
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                balance INTEGER NOT NULL DEFAULT 0,
+                is_active BOOLEAN NOT NULL DEFAULT 1,
+                currency TEXT NOT NULL DEFAULT 'RUB'
+            )
+        """, f"""SELECT id, name, to_minor_units(balance, '{DEFAULT_CURRENCY}'), is_active, '{DEFAULT_CURRENCY}'
+                 FROM accounts""")
+
+        rebuild_table(conn, "operations", """
+            CREATE TABLE {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                amount INTEGER NOT NULL,
+                operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense', 'transfer')),
+                operation_date TEXT NOT NULL,
+                category_id INTEGER NOT NULL,
+                account_id INTEGER NOT NULL,
+                notes TEXT,
+                FOREIGN KEY (category_id) REFERENCES categories (id),
+                FOREIGN KEY (account_id) REFERENCES accounts (id)
+            )
+        """, f"""SELECT id, to_minor_units(amount, '{DEFAULT_CURRENCY}'), operation_type, operation_date,
+                        category_id, account_id, notes
+                 FROM operations""")
+        for statement in OPERATION_INDEXES:
+            conn.execute(statement)
+    finally:
+        conn.create_function("to_minor_units", 2, None)
+
+
+TRANSFER_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_operations_to_account_date "
+    "ON operations (to_account_id, operation_date) WHERE to_account_id IS NOT NULL"
+)
+
+
+@migration(4, "Переводы между счетами: счет зачисления, категория необязательна")
+def _transfers(conn):
+    rebuild_table(conn, "operations", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount INTEGER NOT NULL,
+            operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense', 'transfer')),
+            operation_date TEXT NOT NULL,
+            category_id INTEGER,
+            account_id INTEGER NOT NULL,
+            notes TEXT,
+            to_account_id INTEGER,
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            FOREIGN KEY (account_id) REFERENCES accounts (id),
+            FOREIGN KEY (to_account_id) REFERENCES accounts (id),
+            CHECK((operation_type = 'transfer') = (to_account_id IS NOT NULL))
+        )
+    """, """SELECT id, amount, operation_type, operation_date, category_id, account_id, notes, NULL
+            FROM operations""")
+    for statement in OPERATION_INDEXES:
+        conn.execute(statement)
+    conn.execute(TRANSFER_INDEX)
+
+
+# Знаковое изменение баланса счета списания/зачисления для строки операции
+_SIGNED_AMOUNT = "CASE {row}.operation_type WHEN 'income' THEN {row}.amount ELSE -{row}.amount END"
+
+SNAPSHOT_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_snapshots_insert AFTER INSERT ON operations
+    BEGIN
+        INSERT INTO balance_snapshots (account_id, month, delta, op_count)
+        VALUES (NEW.account_id, substr(NEW.operation_date, 1, 7), {_SIGNED_AMOUNT.format(row="NEW")}, 1)
+        ON CONFLICT (account_id, month) DO UPDATE
+            SET delta = delta + excluded.delta, op_count = op_count + 1;
+        INSERT INTO balance_snapshots (account_id, month, delta, op_count)
+        SELECT NEW.to_account_id, substr(NEW.operation_date, 1, 7), NEW.amount, 1
+        WHERE NEW.to_account_id IS NOT NULL
+        ON CONFLICT (account_id, month) DO UPDATE
+            SET delta = delta + excluded.delta, op_count = op_count + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_snapshots_delete AFTER DELETE ON operations
+    BEGIN
+        UPDATE balance_snapshots
+        SET delta = delta - ({_SIGNED_AMOUNT.format(row="OLD")}), op_count = op_count - 1
+        WHERE account_id = OLD.account_id AND month = substr(OLD.operation_date, 1, 7);
+        UPDATE balance_snapshots
+        SET delta = delta - OLD.amount, op_count = op_count - 1
+        WHERE OLD.to_account_id IS NOT NULL
+            AND account_id = OLD.to_account_id AND month = substr(OLD.operation_date, 1, 7);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_snapshots_update
+    AFTER UPDATE OF amount, operation_type, operation_date, account_id, to_account_id ON operations
+    BEGIN
+        UPDATE balance_snapshots
+        SET delta = delta - ({_SIGNED_AMOUNT.format(row="OLD")}), op_count = op_count - 1
+        WHERE account_id = OLD.account_id AND month = substr(OLD.operation_date, 1, 7);
+        UPDATE balance_snapshots
+        SET delta = delta - OLD.amount, op_count = op_count - 1
+        WHERE OLD.to_account_id IS NOT NULL
+            AND account_id = OLD.to_account_id AND month = substr(OLD.operation_date, 1, 7);
+        INSERT INTO balance_snapshots (account_id, month, delta, op_count)
+        VALUES (NEW.account_id, substr(NEW.operation_date, 1, 7), {_SIGNED_AMOUNT.format(row="NEW")}, 1)
+        ON CONFLICT (account_id, month) DO UPDATE
+            SET delta = delta + excluded.delta, op_count = op_count + 1;
+        INSERT INTO balance_snapshots (account_id, month, delta, op_count)
+        SELECT NEW.to_account_id, substr(NEW.operation_date, 1, 7), NEW.amount, 1
+        WHERE NEW.to_account_id IS NOT NULL
+        ON CONFLICT (account_id, month) DO UPDATE
+            SET delta = delta + excluded.delta, op_count = op_count + 1;
+    END
+    """,
+)
+
+
+@migration(5, "Помесячные снимки оборотов по счетам для баланса на дату")
+def _balance_snapshots(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            account_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            delta INTEGER NOT NULL DEFAULT 0,
+            op_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (account_id, month)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        INSERT INTO balance_snapshots (account_id, month, delta, op_count)
+        SELECT account_id, month, SUM(delta), COUNT(*) FROM (
+            SELECT account_id, substr(operation_date, 1, 7) AS month,
+                   {_SIGNED_AMOUNT.format(row="operations")} AS delta
+            FROM operations
+            UNION ALL
+            SELECT to_account_id, substr(operation_date, 1, 7), amount
+            FROM operations WHERE to_account_id IS NOT NULL
+        )
+        GROUP BY account_id, month
+    """)
+    for statement in SNAPSHOT_TRIGGERS:
+        conn.execute(statement)
+
+
+MONTHLY_TOTALS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_operations_monthly_insert AFTER INSERT ON operations
+    BEGIN
+        INSERT INTO monthly_totals (month, category_id, account_id, operation_type, amount, op_count)
+        VALUES (substr(NEW.operation_date, 1, 7), IFNULL(NEW.category_id, 0), NEW.account_id,
+                NEW.operation_type, NEW.amount, 1)
+        ON CONFLICT (month, category_id, account_id, operation_type) DO UPDATE
+            SET amount = amount + excluded.amount, op_count = op_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_operations_monthly_delete AFTER DELETE ON operations
+    BEGIN
+        UPDATE monthly_totals SET amount = amount - OLD.amount, op_count = op_count - 1
+        WHERE month = substr(OLD.operation_date, 1, 7) AND category_id = IFNULL(OLD.category_id, 0)
+            AND account_id = OLD.account_id AND operation_type = OLD.operation_type;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_operations_monthly_update
+    AFTER UPDATE OF amount, operation_type, operation_date, account_id, category_id ON operations
+    BEGIN
+        UPDATE monthly_totals SET amount = amount - OLD.amount, op_count = op_count - 1
+        WHERE month = substr(OLD.operation_date, 1, 7) AND category_id = IFNULL(OLD.category_id, 0)
+            AND account_id = OLD.account_id AND operation_type = OLD.operation_type;
+        INSERT INTO monthly_totals (month, category_id, account_id, operation_type, amount, op_count)
+        VALUES (substr(NEW.operation_date, 1, 7), IFNULL(NEW.category_id, 0), NEW.account_id,
+                NEW.operation_type, NEW.amount, 1)
+        ON CONFLICT (month, category_id, account_id, operation_type) DO UPDATE
+            SET amount = amount + excluded.amount, op_count = op_count + 1;
+    END
+    """,
+)
+
+
+# Покрывающий индекс для отчетов по дням и неполным месяцам: GROUP BY
+# по дате читает только индекс, не обращаясь к строкам таблицы
+REPORT_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_operations_report "
+    "ON operations (operation_date, account_id, category_id, operation_type, amount)"
+)
+
+
+@migration(6, "Помесячные итоги по категориям, счетам и типам для отчетов")
+def _monthly_totals(conn):
+    # category_id = 0 обозначает операции без категории (переводы)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_totals (
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            account_id INTEGER NOT NULL,
+            operation_type TEXT NOT NULL,
+            amount INTEGER NOT NULL DEFAULT 0,
+            op_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category_id, account_id, operation_type)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO monthly_totals (month, category_id, account_id, operation_type, amount, op_count)
+        SELECT substr(operation_date, 1, 7), IFNULL(category_id, 0), account_id, operation_type,
+               SUM(amount), COUNT(*)
+        FROM operations
+        GROUP BY 1, 2, 3, 4
+    """)
+    for statement in MONTHLY_TOTALS_TRIGGERS:
+        conn.execute(statement)
+    conn.execute(REPORT_INDEX)
+
+
+@migration(7, "Бюджеты категорий по месяцам")
+def _budgets(conn):
+    # Потраченные суммы берутся из monthly_totals, который ведут триггеры операций
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            limit_amount INTEGER NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'RUB',
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (month, category_id, currency),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+    """)
+
+
+# Полнотекстовый индекс заметок операций. Таблица с внешним содержимым
+# (content='operations') хранит только индекс, сами заметки читаются из operations.
+FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS operations_fts USING fts5(
+        notes,
+        content = 'operations',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# unicode61 не сводит «ё» к «е», поэтому индексируется текст с заменой.
+# Длина символов в UTF-8 совпадает, и snippet() по исходным заметкам
+# выделяет те же позиции.
+_FTS_NOTES = "replace(replace({row}.notes, 'ё', 'е'), 'Ё', 'Е')"
+
+FTS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_fts_insert AFTER INSERT ON operations
+    BEGIN
+        INSERT INTO operations_fts (rowid, notes) VALUES (NEW.id, {_FTS_NOTES.format(row="NEW")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_fts_delete AFTER DELETE ON operations
+    BEGIN
+        INSERT INTO operations_fts (operations_fts, rowid, notes)
+        VALUES ('delete', OLD.id, {_FTS_NOTES.format(row="OLD")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_fts_update AFTER UPDATE OF notes ON operations
+    BEGIN
+        INSERT INTO operations_fts (operations_fts, rowid, notes)
+        VALUES ('delete', OLD.id, {_FTS_NOTES.format(row="OLD")});
+        INSERT INTO operations_fts (rowid, notes) VALUES (NEW.id, {_FTS_NOTES.format(row="NEW")});
+    END
+    """,
+)
+
+
+# Заполнение индекса по уже существующим операциям
+FTS_BACKFILL = f"INSERT INTO operations_fts (rowid, notes) SELECT id, {_FTS_NOTES.format(row='operations')} FROM operations"
+
+
+@migration(8, "Полнотекстовый поиск по заметкам операций (FTS5)")
+def _notes_search(conn):
+    # При пересоздании operations нужно заново создать индексы и все наборы
+    # триггеров (SNAPSHOT_TRIGGERS, MONTHLY_TOTALS_TRIGGERS, FTS_TRIGGERS)
+    conn.execute(FTS_TABLE)
+    conn.execute(FTS_BACKFILL)
+    for statement in FTS_TRIGGERS:
+        conn.execute(statement)
+
+
+# Повторы одного правила на одну дату запрещены: повторный запуск
+# планировщика не может создать дубликаты операций
+RULE_OCCURRENCE_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_operations_rule_date "
+    "ON operations (rule_id, operation_date) WHERE rule_id IS NOT NULL"
+)
+
+
+@migration(9, "Правила повторяющихся операций")
+def _recurring_rules(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            amount INTEGER NOT NULL CHECK(amount > 0),
+            operation_type TEXT NOT NULL CHECK(operation_type IN ('income', 'expense', 'transfer')),
+            account_id INTEGER NOT NULL,
+            to_account_id INTEGER,
+            category_id INTEGER,
+            notes TEXT NOT NULL DEFAULT '',
+            frequency TEXT NOT NULL CHECK(frequency IN ('daily', 'weekly', 'monthly', 'yearly')),
+            interval INTEGER NOT NULL DEFAULT 1 CHECK(interval > 0),
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            last_date TEXT,
+            is_active BOOLEAN NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CHECK((operation_type = 'transfer') = (to_account_id IS NOT NULL)),
+            FOREIGN KEY (account_id) REFERENCES accounts (id),
+            FOREIGN KEY (to_account_id) REFERENCES accounts (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+    """)
+    # ADD COLUMN не пересоздает operations, индексы и триггеры остаются на месте
+    if "rule_id" not in table_columns(conn, "operations"):
+        conn.execute("ALTER TABLE operations ADD COLUMN rule_id INTEGER REFERENCES recurring_rules (id)")
+    conn.execute(RULE_OCCURRENCE_INDEX)
+
+
+# Триггеры, которые вычитают удаленные операции из помесячных агрегатов.
+# При переносе операций в архив они временно удаляются: снимки балансов
+# и итоги monthly_totals по архивным годам остаются в основной БД.
+AGGREGATE_DELETE_TRIGGERS = {
+    "trg_operations_snapshots_delete": SNAPSHOT_TRIGGERS[1],
+    "trg_operations_monthly_delete": MONTHLY_TOTALS_TRIGGERS[1],
+}
+
+
+@migration(10, "Реестр годовых архивных разделов операций")
+def _archive_partitions(conn):
+    # Путь к файлу раздела хранится относительно каталога основной БД, если файл лежит в нем
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            year INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            op_count INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+# Версия года операций меняется при любой записи в операции этого года:
+# проверка целостности пересчитывает только годы, версия которых изменилась
+_PERIOD_VERSION = """
+        INSERT INTO operation_periods (year, version)
+        VALUES (CAST(substr({row}.operation_date, 1, 4) AS INTEGER), 1)
+        ON CONFLICT (year) DO UPDATE SET version = version + 1;"""
+
+PERIOD_VERSION_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_period_insert AFTER INSERT ON operations
+    BEGIN{_PERIOD_VERSION.format(row="NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_period_delete AFTER DELETE ON operations
+    BEGIN{_PERIOD_VERSION.format(row="OLD")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_operations_period_update AFTER UPDATE ON operations
+    BEGIN{_PERIOD_VERSION.format(row="OLD")}{_PERIOD_VERSION.format(row="NEW")}
+    END
+    """,
+)
+
+
+@migration(11, "Начальные балансы счетов и версии лет операций для проверки целостности")
+def _integrity(conn):
+    # Начальный баланс существующих счетов восстанавливается из текущего и
+    # оборотов всех месяцев, поэтому в него попадает и накопленное к этому
+    # моменту расхождение. Такие счета помечаются opening_verified = 0, пока
+    # начальный баланс не подтвердят (IntegrityService.confirm_opening_balance).
+    columns = table_columns(conn, "accounts")
+    if "opening_balance" not in columns:
+        conn.execute("ALTER TABLE accounts ADD COLUMN opening_balance INTEGER NOT NULL DEFAULT 0")
+    if "opening_verified" not in columns:
+        conn.execute("ALTER TABLE accounts ADD COLUMN opening_verified INTEGER NOT NULL DEFAULT 1")
+    conn.execute("""
+        UPDATE accounts SET opening_verified = 0, opening_balance = balance - COALESCE(
+            (SELECT SUM(delta) FROM balance_snapshots WHERE balance_snapshots.account_id = accounts.id), 0)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS operation_periods (
+            year INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO operation_periods (year, version)
+        SELECT DISTINCT CAST(substr(operation_date, 1, 4) AS INTEGER), 1 FROM operations
+    """)
+    for statement in PERIOD_VERSION_TRIGGERS:
+        conn.execute(statement)
+    # Результаты последней проверки каждого раздела: main по годам и архивы
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS integrity_checkpoints (
+            source TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            op_count INTEGER NOT NULL,
+            checksum TEXT NOT NULL,
+            totals TEXT NOT NULL,
+            checked_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, year)
+        )
+    """)
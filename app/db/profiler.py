@@ -0,0 +1,423 @@
+"""Профилировщик запросов SQLite и методов сервисов.
+
+Включается переменной окружения FINANCE_PROFILE=1 (или profiler.enable()
+из кода). При выходе из процесса с FINANCE_PROFILE=1 отчет выводится в
+stderr; FINANCE_PROFILE_OUTPUT=путь пишет его в файл, а для пути с
+расширением .json — снимок profiler.stats() в JSON:
+
+    FINANCE_PROFILE=1 python -m app.gui
+    FINANCE_PROFILE=1 FINANCE_PROFILE_OUTPUT=profile.json python -m benchmarks.suite
+
+Как читать отчет profiler.report():
+
+- «Методы сервисов» и «SQL-запросы» отсортированы по суммарному времени
+  (всего, мс): сверху то, на что ушло больше всего времени. p50/p95/p99 —
+  верхние границы корзин логарифмической гистограммы, то есть оценки сверху
+  с погрешностью до ~19%; макс — точное максимальное время. Время запроса
+  включает чтение всех его строк, в скобках — число строк.
+- «Вложенные операторы SQLite» — сколько раз выполнились операторы внутри
+  триггеров и FTS5; большие числа здесь объясняют медленные записи.
+- «Медленные запросы» — запросы дольше SLOW_QUERY_THRESHOLD с планом
+  EXPLAIN QUERY PLAN: строки «SCAN таблица» без индекса — первое, что
+  стоит проверить.
+"""
+
+import atexit
+import functools
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+# Включить профилирование при запуске: FINANCE_PROFILE=1
+PROFILE_ENV = "FINANCE_PROFILE"
+# Куда записать отчет при выходе (по умолчанию stderr); *.json — статистика в JSON
+PROFILE_OUTPUT_ENV = "FINANCE_PROFILE_OUTPUT"
+
+# Запросы дольше порога попадают в журнал медленных запросов вместе с планом
+SLOW_QUERY_THRESHOLD = 0.1  # секунды
+SLOW_LOG_SIZE = 100
+
+# Гистограммы: 4 корзины на каждое удвоение времени (погрешность перцентилей ~19%)
+_BUCKETS_PER_OCTAVE = 4
+_MIN_SECONDS = 1e-6
+
+_PLANNED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class Histogram:
+    """Логарифмическая гистограмма длительностей с постоянной памятью."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        index = int(math.log2(max(seconds, _MIN_SECONDS) / _MIN_SECONDS) * _BUCKETS_PER_OCTAVE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Верхняя граница корзины, в которую попадает p-й перцентиль (секунды)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_MIN_SECONDS * 2 ** ((index + 1) / _BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class StatementStats:
+    """Статистика одного текста SQL: время выполнения и число строк."""
+
+    __slots__ = ("timings", "rows")
+
+    def __init__(self):
+        self.timings = Histogram()
+        self.rows = 0
+
+
+class SlowQuery:
+    """Запись журнала медленных запросов."""
+
+    __slots__ = ("sql", "seconds", "rows", "plan", "at")
+
+    def __init__(self, sql: str, seconds: float, rows: int, plan: List[str]):
+        self.sql = sql
+        self.seconds = seconds
+        self.rows = rows
+        self.plan = plan
+        self.at = time.time()
+
+
+class Profiler:
+    """Сборщик статистики запросов и методов сервисов; по умолчанию выключен.
+
+    - время и число строк каждого SQL-запроса — ProfiledCursor, от execute
+      до последней прочитанной строки;
+    - все выполненные SQLite операторы, включая тела триггеров, — через
+      set_trace_callback (счетчик traced);
+    - время методов сервисов — декоратор profile_methods.
+
+    Пока профилировщик выключен, обертки сводятся к проверке флага enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_threshold = SLOW_QUERY_THRESHOLD
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, slow_threshold: Optional[float] = None):
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.statements: Dict[str, StatementStats] = {}
+            self.methods: Dict[str, Histogram] = {}
+            self.traced: Counter = Counter()
+            self.slow_queries: Deque[SlowQuery] = deque(maxlen=SLOW_LOG_SIZE)
+
+    def trace(self, sql: str):
+        """Колбэк set_trace_callback: считает операторы, которые выполнил SQLite."""
+        if not self.enabled:
+            return
+        if sql.startswith("--"):
+            # Вложенные операторы: тела триггеров, служебные запросы FTS5
+            key = " ".join(sql.split(None, 4)[:4])
+        else:
+            key = sql.split(None, 1)[0].upper() if sql else ""
+        with self._lock:
+            self.traced[key] += 1
+
+    def record_statement(
+        self, conn: sqlite3.Connection, sql: str, seconds: float, rows: int, parameters=None
+    ):
+        """Учитывает выполненный запрос; parameters нужны для плана медленного запроса (None — без плана)."""
+        key = " ".join(sql.split())
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.timings.record(seconds)
+            stats.rows += rows
+        if seconds >= self.slow_threshold:
+            slow = SlowQuery(key, seconds, rows, _query_plan(conn, sql, parameters))
+            with self._lock:
+                self.slow_queries.append(slow)
+
+    def record_method(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.methods.get(name)
+            if histogram is None:
+                histogram = self.methods[name] = Histogram()
+            histogram.record(seconds)
+
+    def stats(self) -> dict:
+        """Снимок статистики в виде словарей (для JSON и сравнения прогонов)."""
+        with self._lock:
+            return {
+                "statements": {
+                    sql: {**stats.timings.summary(), "rows": stats.rows} for sql, stats in self.statements.items()
+                },
+                "methods": {name: histogram.summary() for name, histogram in self.methods.items()},
+                "traced": dict(self.traced),
+                "slow_queries": [
+                    {"sql": slow.sql, "seconds": slow.seconds, "rows": slow.rows, "plan": slow.plan, "at": slow.at}
+                    for slow in self.slow_queries
+                ],
+            }
+
+    def report(self, top: int = 15) -> str:
+        """Текстовый отчет: самые затратные методы и запросы, журнал медленных запросов."""
+        stats = self.stats()
+        lines = []
+
+        def table(title, items, width):
+            lines.append(title)
+            lines.append(f"{'вызовов':>8} {'всего, мс':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'макс':>8}  имя")
+            ranked = sorted(items.items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+            for name, summary in ranked:
+                rows = f" [{summary['rows']} строк]" if "rows" in summary else ""
+                lines.append(
+                    f"{summary['count']:>8} {summary['total'] * 1000:>10.1f}"
+                    + "".join(f" {summary[key] * 1000:>8.2f}" for key in ("p50", "p95", "p99", "max"))
+                    + f"  {name[:width]}{rows}"
+                )
+            lines.append("")
+
+        table("Методы сервисов", stats["methods"], 80)
+        table("SQL-запросы", stats["statements"], 100)
+        nested = {sql: count for sql, count in stats["traced"].items() if sql.startswith("--")}
+        if nested:
+            lines.append("Вложенные операторы SQLite (триггеры, FTS5)")
+            for sql, count in sorted(nested.items(), key=lambda item: item[1], reverse=True)[:top]:
+                lines.append(f"{count:>8}  {sql[3:]}")
+            lines.append("")
+        if stats["slow_queries"]:
+            lines.append(f"Медленные запросы (>= {self.slow_threshold * 1000:.0f} мс)")
+            for slow in stats["slow_queries"]:
+                lines.append(f"{slow['seconds'] * 1000:>8.1f} мс, {slow['rows']} строк: {slow['sql'][:200]}")
+                lines.extend(f"            {step}" for step in slow["plan"])
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = None):
+        """Пишет отчет в файл path (для *.json — stats() в JSON) или в stderr."""
+        if path is None:
+            print(self.report(), file=sys.stderr)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.stats(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.report())
+
+
+def _query_plan(conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+    """EXPLAIN QUERY PLAN запроса с теми же параметрами."""
+    statement = sql.lstrip()
+    if parameters is None or not statement[:7].upper().startswith(_PLANNED_STATEMENTS):
+        return []
+    try:
+        # Метод базового класса: план не должен попадать в статистику сам
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"план недоступен: {e}"]
+    return [row[3] for row in rows]
+
+
+profiler = Profiler()
+if os.environ.get(PROFILE_ENV) == "1":
+    profiler.enable()
+    atexit.register(profiler.dump, os.environ.get(PROFILE_OUTPUT_ENV) or None)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Курсор, который при включенном профилировщике замеряет запросы.
+
+    Время запроса складывается из execute и всех последующих fetch, пока
+    курсор не исчерпан или не выполнен следующий запрос; число строк —
+    прочитанные строки для SELECT и rowcount для изменений.
+    """
+
+    _sql: Optional[str] = None
+
+    def _finish(self):
+        sql, self._sql = self._sql, None
+        if sql is not None:
+            profiler.record_statement(self.connection, sql, self._elapsed, self._rows, self._parameters)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self.connection._sync_trace()
+        if not profiler.enabled:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._elapsed = time.perf_counter() - start
+        self._sql, self._rows, self._parameters = sql, max(self.rowcount, 0), parameters
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self.connection._sync_trace()
+        if not profiler.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed = time.perf_counter() - start
+        # План для executemany не строится: параметры — уже прочитанный поток
+        self._sql, self._rows, self._parameters = sql, max(self.rowcount, 0), None
+        self._finish()
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        self._elapsed += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        if self._sql is None:
+            return super().fetchone()
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        if self._sql is None:
+            return super().fetchmany(size if size is not None else self.arraysize)
+        size = size if size is not None else self.arraysize
+        rows = self._timed_fetch(super().fetchmany, size)
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._sql is None:
+            return super().fetchall()
+        rows = self._timed_fetch(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        if self._sql is None:
+            return self  # без профилирования строки отдает C-итератор курсора
+        return self._profiled_rows()
+
+    def _profiled_rows(self):
+        while True:
+            rows = self.fetchmany(self.arraysize)
+            yield from rows
+            if self._sql is None:
+                return
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Курсор, брошенный до конца выборки (например, после одного fetchone)
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Соединение, чьи курсоры замеряются профилировщиком (см. ProfiledCursor)."""
+
+    _traced = False
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if not profiler.enabled:
+            # Обычный курсор без Python-оберток: выключенный профилировщик ничего не стоит
+            if self._traced:
+                self._sync_trace()
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not profiler.enabled:
+            if self._traced:
+                self._sync_trace()
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def _sync_trace(self):
+        # set_trace_callback можно вызывать только из потока соединения,
+        # поэтому колбэк включается и выключается при очередном запросе
+        if self._traced != profiler.enabled:
+            self.set_trace_callback(profiler.trace if profiler.enabled else None)
+            self._traced = profiler.enabled
+
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """Декоратор: замеряет время вызовов функции, пока профилировщик включен."""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record_method(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def profile_methods(cls):
+    """Декоратор класса: оборачивает profiled() все публичные методы сервиса."""
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and not attr.startswith("_"):
+            setattr(cls, attr, profiled(f"{cls.__name__}.{attr}")(value))
+    return cls
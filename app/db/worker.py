@@ -0,0 +1,166 @@
+
+import queue
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app.db.database import get_db_connection
+
+# Как часто UI-поток забирает готовые результаты, мс
+POLL_INTERVAL_MS = 30
+
+
+class Task:
+    """Вызов сервиса, поставленный в очередь фонового обработчика."""
+
+    def __init__(self, func, args, kwargs, callback, errback, key, group, generation):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.errback = errback
+        self.key = key
+        self.group = group
+        self.generation = generation
+        self.cancelled = False
+
+
+class DbWorker:
+    """Выполняет обращения к БД в фоновых потоках, чтобы не блокировать mainloop Tk.
+
+    Результаты складываются в очередь, которую UI-поток разбирает через
+    after() (см. start_polling), поэтому колбэки всегда вызываются в UI-потоке.
+
+    - key: задачи с одинаковым ключом схлопываются — если предыдущая еще не
+      начала выполняться, она пропускается и выполняется только последняя;
+    - group: задачи группы можно отменить через cancel_group(); уже идущий
+      запрос группы прерывается через sqlite3 interrupt(). Группы
+      предназначены для чтения — записи в них не ставьте.
+    """
+
+    def __init__(self, workers: int = 1):
+        self._tasks: "queue.Queue[Optional[Task]]" = queue.Queue()
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Task] = {}
+        self._generations: Dict[str, int] = {}
+        self._running: Dict[int, tuple] = {}  # id потока -> (задача, соединение)
+        self._pending: Dict[str, int] = {}  # группа -> число незавершенных задач
+        self._poll_job = None
+        self._threads = [
+            threading.Thread(target=self._run, name=f"db-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args,
+        callback: Optional[Callable[[Any], None]] = None,
+        errback: Optional[Callable[[Exception], None]] = None,
+        key: Optional[str] = None,
+        group: Optional[str] = None,
+        **kwargs
+    ) -> Task:
+        """Ставит вызов func(*args, **kwargs) в очередь."""
+        with self._lock:
+            generation = self._generations.get(group, 0)
+            task = Task(func, args, kwargs, callback, errback, key, group, generation)
+            if key is not None:
+                self._latest[key] = task
+            if group is not None:
+                self._pending[group] = self._pending.get(group, 0) + 1
+        self._tasks.put(task)
+        return task
+
+    def has_pending(self, group: str) -> bool:
+        """Есть ли у группы задачи, которые еще ждут очереди или выполняются."""
+        with self._lock:
+            return self._pending.get(group, 0) > 0
+
+    def _done(self, task: Task):
+        if task.group is not None:
+            self._pending[task.group] -= 1
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+
+    def cancel_group(self, group: str) -> int:
+        """Отменяет ожидающие и прерывает выполняющиеся задачи группы.
+
+        Возвращает число прерванных выполняющихся задач.
+        """
+        interrupted = 0
+        with self._lock:
+            self._generations[group] = self._generations.get(group, 0) + 1
+            for task, conn in self._running.values():
+                if task.group == group and not task.cancelled:
+                    task.cancelled = True
+                    conn.interrupt()
+                    interrupted += 1
+        return interrupted
+
+    def _is_stale(self, task: Task) -> bool:
+        if task.cancelled:
+            return True
+        if task.key is not None and self._latest.get(task.key) is not task:
+            return True
+        return task.group is not None and self._generations.get(task.group, 0) != task.generation
+
+    def _run(self):
+        ident = threading.get_ident()
+        conn = get_db_connection()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            with self._lock:
+                if self._is_stale(task):
+                    self._done(task)
+                    continue
+                self._running[ident] = (task, conn)
+            try:
+                result, error = task.func(*task.args, **task.kwargs), None
+            except Exception as e:
+                result, error = None, e
+            finally:
+                with self._lock:
+                    self._running.pop(ident, None)
+                    self._done(task)
+            if task.cancelled and isinstance(error, sqlite3.OperationalError):
+                continue # Запрос прерван cancel_group()
+            self._results.put((task, result, error))
+
+    def process_results(self):
+        """Вызывает колбэки готовых задач; должен вызываться из UI-потока."""
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                stale = task.group is not None and self._generations.get(task.group, 0) != task.generation
+            if stale:
+                continue
+            if error is not None:
+                if task.errback is not None:
+                    task.errback(error)
+            elif task.callback is not None:
+                task.callback(result)
+
+    def start_polling(self, widget, interval_ms: int = POLL_INTERVAL_MS):
+        """Запускает периодический разбор результатов через widget.after()."""
+        def poll():
+            self.process_results()
+            self._poll_job = widget.after(interval_ms, poll)
+        self._poll_job = widget.after(interval_ms, poll)
+
+    def stop(self, widget=None):
+        """Останавливает опрос и фоновые потоки."""
+        if widget is not None and self._poll_job is not None:
+            widget.after_cancel(self._poll_job)
+            self._poll_job = None
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=1)
@@ -1,10 +1,19 @@
 
 import tkinter as tk
+from bisect import bisect_left
+from decimal import Decimal
 from tkinter import ttk, messagebox, simpledialog
 from app.services.account_service import AccountService
 from app.services.category_service import CategoryService
 from app.services.operation_service import OperationService
+from app.services.recurring_service import RecurringService
 from app.models.operation import OperationType
+from app.db.worker import DbWorker
+
+# Сколько операций подгружать за раз при прокрутке
+OPERATIONS_PAGE_SIZE = 200
+# Доля прокрутки, после которой подгружается следующая страница
+LOAD_MORE_THRESHOLD = 0.9
 
 class FinanceApp(tk.Tk):
     def __init__(self, account_service, category_service, operation_service):
@@ -16,6 +25,12 @@ class FinanceApp(tk.Tk):
         self.category_service = category_service
         self.operation_service = operation_service
 
+        # Все обращения к БД идут через фоновый обработчик, результаты
+        # возвращаются в UI-поток опросом очереди через after()
+        self.worker = DbWorker()
+        self.worker.start_polling(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(pady=10, padx=10, fill="both", expand=True)
 
@@ -23,6 +38,44 @@ class FinanceApp(tk.Tk):
         self.create_operations_tab()
         self.create_add_operation_tab()
 
+        # Группа фоновых запросов каждой вкладки и вкладки, чьи запросы были отменены
+        self.tab_groups = {
+            str(self.accounts_frame): "accounts",
+            str(self.operations_frame): "operations",
+            str(self.add_operation_frame): "add_operation",
+        }
+        self.stale_tabs = set()
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event=None):
+        """Отменяет запросы скрытых вкладок и догружает данные открытой."""
+        selected = self.tab_groups.get(self.notebook.select())
+        for group in self.tab_groups.values():
+            if group != selected and group not in self.stale_tabs:
+                if self.worker.has_pending(group):
+                    self.worker.cancel_group(group)
+                    self.stale_tabs.add(group)
+        if selected in self.stale_tabs:
+            self.stale_tabs.discard(selected)
+            if selected == "accounts":
+                self.refresh_accounts()
+            elif selected == "operations":
+                self.operations_load_pending = False
+                self.load_more_operations()
+            else:
+                self.refresh_comboboxes()
+
+    def run_in_background(self, func, *args, callback=None, key=None, group=None, **kwargs):
+        """Выполняет вызов сервиса в фоне; ошибки показываются в диалоге."""
+        def failed(error):
+            messagebox.showerror("Error", f"Произошла ошибка: {error}")
+
+        return self.worker.submit(func, *args, callback=callback, errback=failed, key=key, group=group, **kwargs)
+
+    def on_close(self):
+        self.worker.stop(self)
+        self.destroy()
+
     def create_accounts_tab(self):
         self.accounts_frame = ttk.Frame(self.notebook, width=780, height=580)
         self.notebook.add(self.accounts_frame, text="Счета")
@@ -46,6 +99,10 @@ class FinanceApp(tk.Tk):
         self.operations_tree.heading("Desc", text="Описание")
         self.operations_tree.heading("Account", text="Счет")
         self.operations_tree.heading("Category", text="Категория")
+
+        self.operations_scrollbar = ttk.Scrollbar(self.operations_frame, orient="vertical", command=self.operations_tree.yview)
+        self.operations_tree.configure(yscrollcommand=self.on_operations_scroll)
+        self.operations_scrollbar.pack(side="right", fill="y")
         self.operations_tree.pack(fill="both", expand=True)
         self.refresh_operations()
 
@@ -80,45 +137,130 @@ class FinanceApp(tk.Tk):
         add_button.grid(row=5, column=0, columnspan=2, pady=20)
 
     def refresh_accounts(self):
+        self.run_in_background(
+            self.account_service.get_all_accounts,
+            callback=self.show_accounts, key="accounts", group="accounts"
+        )
+
+    def show_accounts(self, accounts):
         for i in self.accounts_tree.get_children():
             self.accounts_tree.delete(i)
-        for acc in self.account_service.get_all_accounts():
-            self.accounts_tree.insert("", "end", values=(acc.id, acc.name, acc.balance))
+        for acc in accounts:
+            self.accounts_tree.insert("", "end", iid=str(acc.id), values=(acc.id, acc.name, acc.balance))
+
+    def refresh_account(self, account_id):
+        """Обновляет строку одного счета, не перестраивая таблицу."""
+        self.run_in_background(
+            self.account_service.get_account, account_id,
+            callback=lambda acc: self.show_account(account_id, acc), key=f"account:{account_id}"
+        )
+
+    def show_account(self, account_id, acc):
+        iid = str(account_id)
+        if acc is None:
+            if self.accounts_tree.exists(iid):
+                self.accounts_tree.delete(iid)
+        elif self.accounts_tree.exists(iid):
+            self.accounts_tree.item(iid, values=(acc.id, acc.name, acc.balance))
+        else:
+            self.accounts_tree.insert("", "end", iid=iid, values=(acc.id, acc.name, acc.balance))
 
     def refresh_operations(self):
+        """Сбрасывает список операций и загружает первую страницу."""
         for i in self.operations_tree.get_children():
             self.operations_tree.delete(i)
-        for op in self.operation_service.get_all_operations():
-            self.operations_tree.insert("", "end", values=(op.id, op.operation_date, op.operation_type.value, op.amount, op.notes, op.account_id, op.category_id))
+        # Ключи загруженных строк по возрастанию (-дата, -id), т.е. в порядке отображения
+        self.operation_keys = []
+        self.operations_cursor = None
+        self.operations_exhausted = False
+        self.operations_load_pending = False
+        self.operations_generation = getattr(self, "operations_generation", 0) + 1
+        self.worker.cancel_group("operations")
+        self.load_more_operations()
+
+    def load_more_operations(self):
+        """Запрашивает в фоне следующую страницу операций."""
+        if self.operations_exhausted or self.operations_load_pending:
+            return
+        self.operations_load_pending = True
+        generation = self.operations_generation
+        self.run_in_background(
+            self.operation_service.get_operations_page, self.operations_cursor, limit=OPERATIONS_PAGE_SIZE,
+            callback=lambda page: self.show_operations_page(generation, page), group="operations"
+        )
+
+    def show_operations_page(self, generation, page):
+        """Дописывает загруженную страницу в конец списка."""
+        if generation != self.operations_generation:
+            return # Список уже сброшен refresh_operations()
+        self.operations_load_pending = False
+        operations, self.operations_cursor = page
+        for op in operations:
+            self.operation_keys.append(self._operation_key(op))
+            self.operations_tree.insert("", "end", iid=str(op.id), values=self._operation_values(op))
+        self.operations_exhausted = self.operations_cursor is None
+
+    def on_operations_scroll(self, first, last):
+        self.operations_scrollbar.set(first, last)
+        if float(last) >= LOAD_MORE_THRESHOLD and not self.operations_exhausted and not self.operations_load_pending:
+            # Подгрузка меняет область прокрутки, поэтому откладываем ее до простоя
+            self.after_idle(self.load_more_operations)
+
+    def insert_operation(self, op):
+        """Вставляет одну операцию на ее место в уже загруженной части списка."""
+        key = self._operation_key(op)
+        index = bisect_left(self.operation_keys, key)
+        if index == len(self.operation_keys) and not self.operations_exhausted:
+            return # Строка попадет в список с одной из следующих страниц
+        self.operation_keys.insert(index, key)
+        self.operations_tree.insert("", index, iid=str(op.id), values=self._operation_values(op))
+
+    @staticmethod
+    def _operation_key(op):
+        return (-op.operation_date.toordinal(), -op.id)
+
+    @staticmethod
+    def _operation_values(op):
+        return (op.id, op.operation_date, op.operation_type.value, op.amount, op.notes, op.account_id, op.category_id)
 
     def refresh_comboboxes(self):
-        accounts = self.account_service.get_all_accounts()
-        self.account_combobox['values'] = [f"{acc.id}: {acc.name}" for acc in accounts]
+        def load():
+            return self.account_service.get_all_accounts(), self.category_service.get_all_categories()
+        self.run_in_background(load, callback=self.show_comboboxes, key="comboboxes", group="add_operation")
 
-        categories = self.category_service.get_all_categories()
+    def show_comboboxes(self, data):
+        accounts, categories = data
+        self.account_combobox['values'] = [f"{acc.id}: {acc.name}" for acc in accounts]
         self.category_combobox['values'] = [f"{cat.id}: {cat.name}" for cat in categories]
 
     def add_operation(self):
         try:
             op_type = OperationType(self.operation_type.get())
-            amount = float(self.amount_entry.get())
+            amount = Decimal(self.amount_entry.get().replace(',', '.'))
             description = self.description_entry.get()
             account_id = int(self.account_combobox.get().split(':')[0])
             category_id = int(self.category_combobox.get().split(':')[0])
 
-            self.operation_service.add_operation(
-                amount=amount,
-                description=description,
-                account_id=account_id,
-                category_id=category_id,
-                operation_type=op_type
-            )
-            messagebox.showinfo("Success", "Операция успешно добавлена")
-            self.refresh_all()
-            self.amount_entry.delete(0, tk.END)
-            self.description_entry.delete(0, tk.END)
         except Exception as e:
             messagebox.showerror("Error", f"Произошла ошибка: {e}")
+            return
+
+        self.run_in_background(
+            self.operation_service.add_operation,
+            amount=amount,
+            description=description,
+            account_id=account_id,
+            category_id=category_id,
+            operation_type=op_type,
+            callback=self.on_operation_added
+        )
+
+    def on_operation_added(self, op):
+        messagebox.showinfo("Success", "Операция успешно добавлена")
+        self.insert_operation(op)
+        self.refresh_account(op.account_id)
+        self.amount_entry.delete(0, tk.END)
+        self.description_entry.delete(0, tk.END)
     
     def refresh_all(self):
         self.refresh_accounts()
@@ -126,11 +268,15 @@ class FinanceApp(tk.Tk):
         self.refresh_comboboxes()
 
 if __name__ == "__main__":
-    from app.db.database import create_tables
-    create_tables()
+    from app.db.database import init_database
+    init_database()
     account_service = AccountService()
     category_service = CategoryService()
     operation_service = OperationService()
     
     app = FinanceApp(account_service, category_service, operation_service)
+    # Повторяющиеся операции, наступившие с прошлого запуска, создаются в фоне
+    app.run_in_background(
+        RecurringService().run_due, callback=lambda created: app.refresh_all() if created else None
+    )
     app.mainloop()
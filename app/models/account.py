@@ -2,10 +2,13 @@
 from dataclasses import dataclass
 from decimal import Decimal
 
-@dataclass
+from app.models.money import DEFAULT_CURRENCY
+
+@dataclass(slots=True)
 class Account:
     """Модель данных для счета."""
     id: int
     name: str
     balance: Decimal
     is_active: bool = True
+    currency: str = DEFAULT_CURRENCY
@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+@dataclass(slots=True)
+class ArchivePartition:
+    """Закрытый год операций, вынесенный в отдельный файл БД."""
+    year: int
+    path: str  # относительно каталога основной БД или абсолютный
+    op_count: int
+    created_at: str = ""
+
+    @property
+    def id(self) -> int:
+        # Ключ раздела в кэше — год
+        return self.year
+
+    @property
+    def date_from(self) -> date:
+        return date(self.year, 1, 1)
+
+    @property
+    def date_to(self) -> date:
+        return date(self.year, 12, 31)
+
+    def overlaps(self, date_from: Optional[date], date_to: Optional[date]) -> bool:
+        """Пересекается ли год раздела с периодом [date_from, date_to] (None — без границы)."""
+        return ((date_from is None or date_from <= self.date_to)
+                and (date_to is None or date_to >= self.date_from))
@@ -0,0 +1,24 @@
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from app.models.category import Category
+from app.models.money import DEFAULT_CURRENCY
+
+@dataclass
+class Budget:
+    """Модель данных для бюджета категории на месяц."""
+    id: int
+    category_id: int
+    month: str  # формат: YYYY-MM
+    limit: Decimal
+    currency: str = DEFAULT_CURRENCY
+
+@dataclass
+class BudgetProgress:
+    """Исполнение бюджета: сколько потрачено и сколько осталось."""
+    budget: Budget
+    category: Category
+    spent: Decimal
+    remaining: Decimal
+    percentage: float
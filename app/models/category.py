@@ -8,7 +8,7 @@ class OperationType(Enum):
     EXPENSE = "expense"
     TRANSFER = "transfer"
 
-@dataclass
+@dataclass(slots=True)
 class Category:
     """Модель данных для категории."""
     id: int
@@ -0,0 +1,34 @@
+from dataclasses import dataclass, field
+from typing import List
+
+@dataclass(slots=True)
+class Discrepancy:
+    """Расхождение хранимого значения с пересчитанным по операциям.
+
+    kind: "balance" (accounts.balance), "snapshot" (balance_snapshots),
+    "monthly_total" (monthly_totals), "orphan" (операции удаленного счета)
+    или "checksum" (содержимое раздела изменилось без смены версии).
+    Суммы в минорных единицах.
+    """
+    kind: str
+    key: tuple
+    expected: tuple
+    actual: tuple
+
+@dataclass(slots=True)
+class IntegrityReport:
+    """Итог проверки целостности журнала."""
+    partitions: int
+    scanned: int
+    reused: int
+    operations: int
+    discrepancies: List[Discrepancy] = field(default_factory=list)
+    # Счета, чей начальный баланс восстановлен миграцией и не подтвержден:
+    # их баланс сверяется только с состоянием на момент миграции
+    unverified_accounts: List[int] = field(default_factory=list)
+    repaired: bool = False
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.discrepancies
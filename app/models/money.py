@@ -0,0 +1,43 @@
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Union
+
+DEFAULT_CURRENCY = "RUB"
+
+# Количество знаков дробной части (минорных единиц) по валютам ISO 4217
+CURRENCY_SCALES = {
+    "RUB": 2,
+    "USD": 2,
+    "EUR": 2,
+    "GBP": 2,
+    "CNY": 2,
+    "KZT": 2,
+    "BYN": 2,
+    "JPY": 0,
+    "KRW": 0,
+    "KWD": 3,
+}
+
+Amount = Union[Decimal, str, int, float]
+
+
+def currency_scale(currency: str) -> int:
+    """Возвращает число знаков после запятой для валюты."""
+    try:
+        return CURRENCY_SCALES[currency]
+    except KeyError:
+        raise ValueError(f"Неизвестная валюта: {currency}")
+
+
+def to_minor(amount: Amount, currency: str = DEFAULT_CURRENCY) -> int:
+    """Переводит сумму в целые минорные единицы (копейки), округляя половину вверх."""
+    if isinstance(amount, float):
+        # repr float дает кратчайшее точное десятичное представление: 0.1 -> "0.1"
+        amount = repr(amount)
+    value = Decimal(amount).scaleb(currency_scale(currency))
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(value: int, currency: str = DEFAULT_CURRENCY) -> Decimal:
+    """Переводит целые минорные единицы обратно в Decimal с точностью валюты."""
+    return Decimal(value).scaleb(-currency_scale(currency))
@@ -2,20 +2,28 @@
 from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
-from enum import Enum
+from typing import Optional
 
-class OperationType(Enum):
-    """Тип операции: доход или расход."""
-    INCOME = "income"
-    EXPENSE = "expense"
+from app.models.category import OperationType
 
-@dataclass
+@dataclass(slots=True)
 class Operation:
-    """Модель данных для операции."""
+    """Модель данных для операции.
+
+    Для перевода account_id — счет списания, to_account_id — счет зачисления.
+    """
     id: int
     amount: Decimal
     operation_type: OperationType
     operation_date: date
-    category_id: int
+    category_id: Optional[int]
     account_id: int
     notes: str = ""
+    to_account_id: Optional[int] = None
+
+@dataclass(slots=True)
+class SearchResult:
+    """Найденная операция с фрагментом заметки и релевантностью (чем меньше rank, тем выше)."""
+    operation: Operation
+    snippet: str
+    rank: float
@@ -0,0 +1,220 @@
+
+from array import array
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.models.category import OperationType
+from app.models.money import DEFAULT_CURRENCY, from_minor
+from app.models.operation import Operation
+
+# Коды типов операций в колонке types
+TYPE_CODES = {op_type: code for code, op_type in enumerate(OperationType)}
+OPERATION_TYPES = list(OperationType)
+
+# Значение колонок category_ids и to_account_ids, означающее NULL
+NO_ID = 0
+
+# Числовые колонки пакета и их типы array
+COLUMN_TYPES = {
+    "ids": "q",
+    "amounts": "q",
+    "dates": "i",
+    "types": "b",
+    "category_ids": "q",
+    "account_ids": "q",
+    "to_account_ids": "q",
+}
+COLUMNS = tuple(COLUMN_TYPES)
+
+# Ключи группировки batch.grouped_rows() — те же, что у ReportService.totals()
+BATCH_GROUPINGS = ("day", "week", "month", "year", "category", "account", "type")
+
+
+class OperationBatch:
+    """Операции в колоночном виде: по одному компактному массиву на поле.
+
+    ids, amounts (минорные единицы), dates (date.toordinal()), types (коды
+    TYPE_CODES), category_ids, account_ids и to_account_ids хранятся в
+    array.array по 8 байт (даты — 4, типы — 1) на строку; NULL в
+    category_ids и to_account_ids хранится как NO_ID. Объекты на строку не
+    создаются: batch[i] и итерация возвращают легкие представления
+    OperationView, которые читают значения из колонок при обращении.
+    """
+
+    __slots__ = (
+        "ids", "amounts", "dates", "types", "category_ids", "account_ids", "to_account_ids", "notes",
+        "currencies",
+    )
+
+    def __init__(self, currencies: Optional[Dict[int, str]] = None):
+        for name, typecode in COLUMN_TYPES.items():
+            setattr(self, name, array(typecode))
+        self.notes: List[str] = []
+        # Валюты счетов: по ним суммы переводятся из минорных единиц
+        self.currencies = currencies if currencies is not None else {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> "OperationView":
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError("индекс операции вне пакета")
+        return OperationView(self, index)
+
+    def __iter__(self) -> Iterator["OperationView"]:
+        for index in range(len(self.ids)):
+            yield OperationView(self, index)
+
+    def extend_rows(self, rows: Sequence[tuple]):
+        """Добавляет строки (id, amount, ordinal, код типа, category_id, account_id, to_account_id, notes).
+
+        Строки транспонируются целиком, поэтому колонки пополняются
+        одним extend() на массив. Лишние колонки в конце строки (например,
+        ключ сортировки запроса) отбрасываются.
+        """
+        if not rows:
+            return
+        ids, amounts, dates, types, category_ids, account_ids, to_account_ids, notes, *_ = zip(*rows)
+        self.ids.extend(ids)
+        self.amounts.extend(amounts)
+        self.dates.extend(dates)
+        self.types.extend(types)
+        self.category_ids.extend(category_ids)
+        self.account_ids.extend(account_ids)
+        self.to_account_ids.extend(to_account_ids)
+        self.notes.extend(notes)
+
+    def extend(self, other: "OperationBatch"):
+        """Дописывает в конец колонки другого пакета."""
+        for name in COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+        self.notes.extend(other.notes)
+
+    def columns(self) -> Dict[str, array]:
+        """Числовые колонки пакета по именам COLUMNS."""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def nbytes(self) -> int:
+        """Размер числовых колонок в байтах (без строк notes)."""
+        return sum(len(column) * column.itemsize for column in self.columns().values())
+
+    def operation(self, index: int) -> Operation:
+        """Создает полноценный объект Operation для строки index."""
+        return self[index].to_operation()
+
+    def to_operations(self) -> List[Operation]:
+        return [view.to_operation() for view in self]
+
+    def grouped_rows(self, group_by: Iterable[str]) -> List[tuple]:
+        """Суммирует пакет по ключам и счету, не создавая объектов на строку.
+
+        Возвращает кортежи (ключи..., account_id, доход, расход, число) в
+        минорных единицах — в той же форме, что и SQL-группировки ReportService.
+        Ключ "category" без категории равен NO_ID, "day" и "week" — ISO-дата дня.
+        """
+        group_by = list(group_by)
+        unknown = [key for key in group_by if key not in BATCH_GROUPINGS]
+        if unknown:
+            raise ValueError(f"Неизвестная группировка: {', '.join(unknown)}")
+
+        # Строки дат считаются один раз на различный день, а не на каждую операцию
+        day_labels: Dict[int, str] = {}
+
+        def day_label(ordinal: int) -> str:
+            label = day_labels.get(ordinal)
+            if label is None:
+                label = day_labels[ordinal] = date.fromordinal(ordinal).isoformat()
+            return label
+
+        def key_column(key: str):
+            if key in ("day", "week"):
+                return map(day_label, self.dates)
+            if key == "month":
+                return (day_label(ordinal)[:7] for ordinal in self.dates)
+            if key == "year":
+                return (day_label(ordinal)[:4] for ordinal in self.dates)
+            if key == "category":
+                return self.category_ids
+            if key == "account":
+                return self.account_ids
+            return (OPERATION_TYPES[code].value for code in self.types)
+
+        income_code = TYPE_CODES[OperationType.INCOME]
+        expense_code = TYPE_CODES[OperationType.EXPENSE]
+        groups: Dict[tuple, List[int]] = {}
+        keys = zip(*(key_column(key) for key in group_by), self.account_ids)
+        for group, code, amount in zip(keys, self.types, self.amounts):
+            totals = groups.get(group)
+            if totals is None:
+                totals = groups[group] = [0, 0, 0]
+            if code == income_code:
+                totals[0] += amount
+            elif code == expense_code:
+                totals[1] += amount
+            totals[2] += 1
+        return [(*group, *totals) for group, totals in groups.items()]
+
+
+class OperationView:
+    """Представление строки OperationBatch с полями Operation; значения читаются из колонок."""
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: OperationBatch, index: int):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return self._batch.ids[self._index]
+
+    @property
+    def minor_amount(self) -> int:
+        return self._batch.amounts[self._index]
+
+    @property
+    def amount(self) -> Decimal:
+        currency = self._batch.currencies.get(self.account_id, DEFAULT_CURRENCY)
+        return from_minor(self.minor_amount, currency)
+
+    @property
+    def operation_type(self) -> OperationType:
+        return OPERATION_TYPES[self._batch.types[self._index]]
+
+    @property
+    def operation_date(self) -> date:
+        return date.fromordinal(self._batch.dates[self._index])
+
+    @property
+    def category_id(self) -> Optional[int]:
+        return self._batch.category_ids[self._index] or None
+
+    @property
+    def account_id(self) -> int:
+        return self._batch.account_ids[self._index]
+
+    @property
+    def notes(self) -> str:
+        return self._batch.notes[self._index]
+
+    @property
+    def to_account_id(self) -> Optional[int]:
+        return self._batch.to_account_ids[self._index] or None
+
+    def to_operation(self) -> Operation:
+        return Operation(
+            id=self.id,
+            amount=self.amount,
+            operation_type=self.operation_type,
+            operation_date=self.operation_date,
+            category_id=self.category_id,
+            account_id=self.account_id,
+            notes=self.notes,
+            to_account_id=self.to_account_id
+        )
+
+    def __repr__(self) -> str:
+        return f"OperationView(id={self.id}, amount={self.amount}, date={self.operation_date})"
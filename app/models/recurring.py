@@ -0,0 +1,73 @@
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Iterator, Optional
+
+from app.models.category import OperationType
+
+class Frequency(Enum):
+    """Единица периода повторения правила."""
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+
+@dataclass(slots=True)
+class RecurringRule:
+    """Правило повторяющейся операции: зарплата, аренда, подписка.
+
+    Операция повторяется каждые interval единиц frequency, начиная со
+    start_date и до end_date включительно. last_date — дата последнего уже
+    созданного повтора.
+    """
+    id: int
+    name: str
+    amount: Decimal
+    operation_type: OperationType
+    account_id: int
+    frequency: Frequency
+    start_date: date
+    interval: int = 1
+    category_id: Optional[int] = None
+    to_account_id: Optional[int] = None
+    notes: str = ""
+    end_date: Optional[date] = None
+    last_date: Optional[date] = None
+    is_active: bool = True
+
+    def occurrence(self, index: int) -> date:
+        """Дата повтора с номером index (0 — start_date).
+
+        Для месячных и годовых правил день берется из start_date и
+        ограничивается длиной месяца: правило на 31-е число в феврале
+        срабатывает 28-го (29-го), а в марте снова 31-го.
+        """
+        start, step = self.start_date, self.interval * index
+        if self.frequency == Frequency.DAILY:
+            return start + timedelta(days=step)
+        if self.frequency == Frequency.WEEKLY:
+            return start + timedelta(weeks=step)
+        months = step * 12 if self.frequency == Frequency.YEARLY else step
+        year, month = divmod(start.month - 1 + months, 12)
+        year += start.year
+        return date(year, month + 1, min(start.day, calendar.monthrange(year, month + 1)[1]))
+
+    def occurrences(self, after: Optional[date], until: date) -> Iterator[date]:
+        """Даты повторов в интервале (after, until] с учетом start_date и end_date."""
+        if self.end_date is not None and self.end_date < until:
+            until = self.end_date
+        index = 0
+        if after is not None and after >= self.start_date and self.frequency in (Frequency.DAILY, Frequency.WEEKLY):
+            # Для дней и недель номер первого повтора после after вычисляется сразу
+            unit = self.interval * (7 if self.frequency == Frequency.WEEKLY else 1)
+            index = (after - self.start_date).days // unit
+        while True:
+            day = self.occurrence(index)
+            if day > until:
+                return
+            if after is None or day > after:
+                yield day
+            index += 1
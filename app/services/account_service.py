@@ -1,67 +1,139 @@
 
+from datetime import date
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from app.db.database import get_db_connection
+from app.db.database import get_db_connection, transaction
+from app.db.profiler import profile_methods
 from app.models.account import Account
+from app.models.money import DEFAULT_CURRENCY, Amount, from_minor, to_minor
+from app.services.archive_service import operation_schemas, operations_source
+from app.services.cache import TableCache
 
+def _row_to_account(row) -> Account:
+    return Account(
+        id=row['id'],
+        name=row['name'],
+        balance=from_minor(row['balance'], row['currency']),
+        is_active=bool(row['is_active']),
+        currency=row['currency']
+    )
+
+def _load_accounts(conn) -> List[Account]:
+    return [_row_to_account(row) for row in conn.execute("SELECT * FROM accounts ORDER BY id")]
+
+# Общий для всех экземпляров сервисов кэш счетов. Сбрасывается при
+# изменении счетов и балансов (в том числе из OperationService).
+accounts_cache: TableCache[Account] = TableCache(_load_accounts, indexes={"active": lambda acc: acc.is_active})
+
+@profile_methods
 class AccountService:
     """Сервис для управления счетами с использованием БД."""
 
-    def create_account(self, name: str, initial_balance: str) -> Account:
+    def create_account(self, name: str, initial_balance: Amount, currency: str = DEFAULT_CURRENCY) -> Account:
         """Создает новый счет в БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO accounts (name, balance) VALUES (?, ?)", 
-            (name, initial_balance)
+        balance = to_minor(initial_balance, currency)
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO accounts (name, balance, opening_balance, currency) VALUES (?, ?, ?, ?)",
+                (name, balance, balance, currency)
+            )
+            new_id = cursor.lastrowid
+        accounts_cache.invalidate()
+        return Account(
+            id=new_id, name=name, balance=from_minor(balance, currency), is_active=True, currency=currency
         )
-        conn.commit()
-        new_id = cursor.lastrowid
-        conn.close()
-        return Account(id=new_id, name=name, balance=Decimal(initial_balance), is_active=True)
 
     def get_account(self, account_id: int) -> Optional[Account]:
-        """Возвращает счет по ID из БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            return Account(**dict(row))
-        return None
+        """Возвращает счет по ID (из кэша счетов)."""
+        return accounts_cache.get(account_id)
 
     def get_all_accounts(self) -> List[Account]:
-        """Возвращает все счета из БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM accounts")
-        rows = cursor.fetchall()
-        conn.close()
-        return [Account(**dict(row)) for row in rows]
+        """Возвращает все счета (из кэша счетов)."""
+        return accounts_cache.all()
 
     def update_account(self, account_id: int, new_name: str, is_active: bool) -> Optional[Account]:
         """Обновляет данные счета в БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE accounts SET name = ?, is_active = ? WHERE id = ?",
-            (new_name, is_active, account_id)
-        )
-        conn.commit()
-        updated_rows = cursor.rowcount
-        conn.close()
+        with transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE accounts SET name = ?, is_active = ? WHERE id = ?",
+                (new_name, is_active, account_id)
+            )
+            updated_rows = cursor.rowcount
+        accounts_cache.invalidate()
         if updated_rows > 0:
             return self.get_account(account_id) # Возвращаем обновленные данные
         return None
 
     def delete_account(self, account_id: int) -> bool:
-        """Удаляет счет из БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
-        conn.commit()
-        deleted_rows = cursor.rowcount
-        conn.close()
+        """Удаляет счет из БД.
+
+        Счет с операциями (в том числе архивными и входящими переводами) или
+        правилами повторяющихся операций не удаляется: иначе операции и
+        агрегаты остались бы без счета. Такой счет можно деактивировать.
+        """
+        with transaction() as conn:
+            # Любая операция счета оставляет строку в balance_snapshots основной БД
+            in_use = conn.execute(
+                """SELECT EXISTS (SELECT 1 FROM balance_snapshots WHERE account_id = ? AND op_count > 0)
+                       OR EXISTS (SELECT 1 FROM recurring_rules WHERE account_id = ? OR to_account_id = ?)""",
+                (account_id, account_id, account_id)
+            ).fetchone()[0]
+            if in_use:
+                raise ValueError(
+                    "По счету есть операции или правила повторяющихся операций: его можно только деактивировать."
+                )
+            cursor = conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+            deleted_rows = cursor.rowcount
+        accounts_cache.invalidate()
         return deleted_rows > 0
+
+    def get_balance_as_of(self, account_id: int, as_of: date) -> Optional[Decimal]:
+        """Возвращает баланс счета на конец дня as_of.
+
+        Отсчет идет от текущего баланса назад: вычитаются помесячные обороты
+        из balance_snapshots за месяцы после as_of и операции самого месяца
+        as_of, проведенные после этой даты. Читается O(месяцев) снимков и
+        операции не более чем одного месяца. Снимки хранят и обороты
+        архивных лет, поэтому архив читается, только если as_of попадает в
+        архивный год.
+        """
+        conn = get_db_connection()
+        row = conn.execute("SELECT balance, currency FROM accounts WHERE id = ?", (account_id,)).fetchone()
+        if not row:
+            return None
+        month = as_of.strftime("%Y-%m")
+        next_month = date(as_of.year + as_of.month // 12, as_of.month % 12 + 1, 1).isoformat()
+        later_months = conn.execute(
+            "SELECT COALESCE(SUM(delta), 0) FROM balance_snapshots WHERE account_id = ? AND month > ?",
+            (account_id, month)
+        ).fetchone()[0]
+        rest_of_month = conn.execute(
+            f"""SELECT COALESCE(SUM(CASE
+                    WHEN to_account_id = :account THEN amount
+                    WHEN operation_type = 'income' THEN amount
+                    ELSE -amount END), 0)
+               FROM {operations_source(operation_schemas(as_of, as_of))}
+               WHERE (account_id = :account OR to_account_id = :account)
+                 AND operation_date > :as_of AND operation_date < :next_month""",
+            {"account": account_id, "as_of": as_of.isoformat(), "next_month": next_month}
+        ).fetchone()[0]
+        return from_minor(row['balance'] - later_months - rest_of_month, row['currency'])
+
+    def get_monthly_balances(self, account_id: int) -> List[Tuple[str, Decimal]]:
+        """Возвращает балансы счета на конец каждого месяца с операциями: [("YYYY-MM", баланс)]."""
+        conn = get_db_connection()
+        row = conn.execute("SELECT balance, currency FROM accounts WHERE id = ?", (account_id,)).fetchone()
+        if not row:
+            return []
+        snapshots = conn.execute(
+            "SELECT month, delta FROM balance_snapshots WHERE account_id = ? AND op_count > 0 ORDER BY month DESC",
+            (account_id,)
+        ).fetchall()
+        balance = row['balance']
+        history = []
+        for snapshot in snapshots:
+            history.append((snapshot['month'], from_minor(balance, row['currency'])))
+            balance -= snapshot['delta']
+        history.reverse()
+        return history
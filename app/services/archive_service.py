@@ -0,0 +1,286 @@
+
+import os
+import sqlite3
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.db.database import get_connection_manager, get_db_connection, transaction
+from app.db.migrations import (
+    AGGREGATE_DELETE_TRIGGERS, FTS_BACKFILL, FTS_TABLE, OPERATION_INDEXES, REPORT_INDEX, TRANSFER_INDEX,
+)
+from app.db.profiler import profile_methods
+from app.models.archive import ArchivePartition
+from app.models.money import from_minor
+from app.services.cache import TableCache
+
+# Колонки операций в общем для основной БД и архивов порядке
+OPERATION_COLUMNS = "id, amount, operation_type, operation_date, category_id, account_id, notes, to_account_id, rule_id"
+
+# Файлы разделов по умолчанию лежат в подкаталоге рядом с основной БД
+ARCHIVE_DIRECTORY = "archive"
+ARCHIVE_FILE = "finance-{year}.db"
+ARCHIVE_FORMAT_VERSION = 1
+
+# Имя схемы, под которым раздел подключается через ATTACH
+ARCHIVE_SCHEMA = "archive_{year}"
+
+# Схема файла раздела: операции с теми же индексами и полнотекстовым
+# индексом, что и в основной БД, конечные балансы счетов на 31 декабря и
+# контрольные суммы перенесенных операций
+ARCHIVE_TABLES = (
+    """
+    CREATE TABLE operations (
+        id INTEGER PRIMARY KEY,
+        amount INTEGER NOT NULL,
+        operation_type TEXT NOT NULL,
+        operation_date TEXT NOT NULL,
+        category_id INTEGER,
+        account_id INTEGER NOT NULL,
+        notes TEXT,
+        to_account_id INTEGER,
+        rule_id INTEGER
+    )
+    """,
+    *OPERATION_INDEXES,
+    TRANSFER_INDEX,
+    REPORT_INDEX,
+    FTS_TABLE,
+    """
+    CREATE TABLE closing_balances (
+        account_id INTEGER PRIMARY KEY,
+        balance INTEGER NOT NULL,
+        currency TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE partition_info (
+        year INTEGER NOT NULL,
+        op_count INTEGER NOT NULL,
+        amount_sum INTEGER NOT NULL,
+        max_id INTEGER NOT NULL
+    )
+    """,
+)
+
+# Контрольная сумма операций периода: перенос отменяется, если она изменилась
+CHECKSUM_SQL = (
+    "SELECT COUNT(*), COALESCE(SUM(amount), 0), COALESCE(MAX(id), 0) "
+    "FROM {table} WHERE operation_date BETWEEN ? AND ?"
+)
+
+def _load_partitions(conn) -> List[ArchivePartition]:
+    rows = conn.execute("SELECT * FROM archive_partitions ORDER BY year DESC").fetchall()
+    return [
+        ArchivePartition(year=row['year'], path=row['path'], op_count=row['op_count'], created_at=row['created_at'])
+        for row in rows
+    ]
+
+# Реестр разделов читается почти каждым запросом к операциям, поэтому кэшируется
+partitions_cache: TableCache[ArchivePartition] = TableCache(_load_partitions)
+
+def _database_directory() -> str:
+    database = get_connection_manager().database
+    if database == ":memory:" or database.startswith("file:"):
+        raise ValueError("Архивные разделы доступны только для БД в обычном файле.")
+    return os.path.dirname(os.path.abspath(database))
+
+def file_uri(path: str, mode: str) -> str:
+    """URI файла БД для sqlite3.connect(..., uri=True) и ATTACH; mode — ro, rw или rwc."""
+    return f"{Path(os.path.abspath(path)).as_uri()}?mode={mode}"
+
+def partition_file(partition: ArchivePartition) -> str:
+    """Полный путь к файлу раздела."""
+    return os.path.join(_database_directory(), partition.path)
+
+def _attach(conn: sqlite3.Connection, partitions: List[ArchivePartition]):
+    """Подключает разделы к соединению потока, если они еще не подключены.
+
+    Разделы подключаются только для чтения; immutable=1 избавляет SQLite от
+    блокировок и проверок изменений файла. Число подключенных БД ограничено
+    (SQLITE_LIMIT_ATTACHED), поэтому лишние разделы, не нужные текущему
+    запросу, отключаются. Раздел, который читает незавершенный запрос того
+    же соединения (например, потоковый экспорт), SQLite отключить не дает
+    («database is locked»): такие разделы пропускаются, а если свободных
+    мест все равно не хватает, поднимается ValueError.
+    """
+    attached = [row[1] for row in conn.execute("PRAGMA database_list") if row[1] not in ("main", "temp")]
+    needed = {ARCHIVE_SCHEMA.format(year=partition.year) for partition in partitions}
+    missing = [partition for partition in partitions if ARCHIVE_SCHEMA.format(year=partition.year) not in attached]
+    if not missing:
+        return
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(needed) > limit:
+        raise ValueError(
+            f"Период затрагивает {len(needed)} архивных разделов, одновременно можно подключить {limit}."
+        )
+    excess = len(attached) + len(missing) - limit
+    busy = []
+    for schema in [name for name in attached if name not in needed]:
+        if excess <= 0:
+            break
+        try:
+            conn.execute(f"DETACH DATABASE {schema}")
+        except sqlite3.OperationalError:
+            busy.append(schema)  # его читает незавершенный запрос
+            continue
+        excess -= 1
+    if excess > 0:
+        raise ValueError(
+            f"Не хватает мест для подключения архивных разделов (лимит {limit}): разделы "
+            f"{', '.join(busy)} читают незавершенные запросы. Дочитайте их и повторите."
+        )
+    for partition in missing:
+        conn.execute(
+            f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA.format(year=partition.year)}",
+            (file_uri(partition_file(partition), "ro") + "&immutable=1",)
+        )
+
+def operation_schemas(date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[str]:
+    """Схемы с операциями за период: main и пересекающиеся с ним архивные разделы.
+
+    Разделы подключаются к соединению потока при первом обращении. Основная
+    БД участвует всегда: в нее можно добавить операцию задним числом и после
+    архивации года. Архивы идут от новых к старым.
+    """
+    partitions = [partition for partition in partitions_cache.all() if partition.overlaps(date_from, date_to)]
+    if not partitions:
+        return ["main"]
+    _attach(get_db_connection(), partitions)
+    return ["main", *(ARCHIVE_SCHEMA.format(year=partition.year) for partition in partitions)]
+
+def operations_source(schemas: List[str], columns: str = OPERATION_COLUMNS) -> str:
+    """Источник для FROM: таблица операций или UNION ALL таблиц всех схем.
+
+    Условия внешнего WHERE SQLite переносит внутрь каждой ветви UNION ALL,
+    поэтому индексы разделов используются.
+    """
+    if len(schemas) == 1:
+        return f"{schemas[0]}.operations"
+    return "(" + " UNION ALL ".join(f"SELECT {columns} FROM {schema}.operations" for schema in schemas) + ")"
+
+def _build_partition(path: str, source: str, year: int) -> tuple:
+    """Создает файл раздела path из операций года в БД source; возвращает контрольную сумму.
+
+    Файл собирается отдельным соединением, которое читает основную БД
+    только для чтения в одной транзакции: операции, индекс заметок и
+    конечные балансы берутся из одного согласованного снимка.
+    """
+    period = (f"{year}-01-01", f"{year}-12-31")
+    build = sqlite3.connect(file_uri(path, "rwc"), uri=True, isolation_level=None)
+    try:
+        build.execute("ATTACH DATABASE ? AS source", (file_uri(source, "ro"),))
+        build.execute("BEGIN")
+        for statement in ARCHIVE_TABLES:
+            build.execute(statement)
+        build.execute(
+            f"INSERT INTO operations ({OPERATION_COLUMNS}) SELECT {OPERATION_COLUMNS} FROM source.operations "
+            "WHERE operation_date BETWEEN ? AND ? ORDER BY id",
+            period
+        )
+        build.execute(FTS_BACKFILL)
+        # Баланс на 31 декабря: текущий баланс минус обороты всех следующих месяцев
+        build.execute(
+            """INSERT INTO closing_balances (account_id, balance, currency)
+               SELECT a.id, a.balance - COALESCE((
+                          SELECT SUM(s.delta) FROM source.balance_snapshots s
+                          WHERE s.account_id = a.id AND s.month > ?), 0),
+                      a.currency
+               FROM source.accounts a""",
+            (f"{year}-12",)
+        )
+        checksum = tuple(build.execute(CHECKSUM_SQL.format(table="main.operations"), period).fetchone())
+        build.execute("INSERT INTO partition_info (year, op_count, amount_sum, max_id) VALUES (?, ?, ?, ?)",
+                      (year, *checksum))
+        build.execute(f"PRAGMA user_version = {ARCHIVE_FORMAT_VERSION}")
+        build.execute("COMMIT")
+        build.execute("DETACH DATABASE source")
+        build.execute("ANALYZE")
+    finally:
+        build.close()
+    return checksum
+
+@profile_methods
+class ArchiveService:
+    """Перенос закрытых лет операций в отдельные файлы-разделы.
+
+    Разделы подключаются к соединениям через ATTACH только для чтения, и
+    запросы OperationService, AccountService и ReportService читают из них
+    только те годы, которые пересекаются с запрошенным периодом (см.
+    operation_schemas). Помесячные снимки балансов и итоги monthly_totals
+    остаются в основной БД, поэтому отчеты по месяцам и балансы на дату
+    к разделам не обращаются.
+    """
+
+    def get_partitions(self) -> List[ArchivePartition]:
+        """Возвращает архивные разделы от новых лет к старым."""
+        return partitions_cache.all()
+
+    def archive_year(self, year: int, directory: Optional[str] = None, vacuum: bool = False) -> ArchivePartition:
+        """Переносит операции года year в файл раздела и удаляет их из основной БД.
+
+        Сначала файл раздела полностью собирается и фиксируется, затем в
+        одной транзакции основной БД сверяется контрольная сумма операций
+        года, операции удаляются (триггеры помесячных агрегатов на это время
+        снимаются) и раздел регистрируется. Если операции года изменились,
+        перенос отменяется. vacuum=True после переноса сжимает основную БД.
+        """
+        if year >= date.today().year:
+            raise ValueError("Архивировать можно только закрытые (прошедшие) годы.")
+        if partitions_cache.get(year) is not None:
+            raise ValueError(f"{year} год уже перенесен в архив.")
+        base = _database_directory()
+        directory = os.path.abspath(directory or os.path.join(base, ARCHIVE_DIRECTORY))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, ARCHIVE_FILE.format(year=year))
+        if os.path.exists(path):
+            raise ValueError(f"Файл раздела {path} уже существует.")
+
+        building = f"{path}.tmp"
+        if os.path.exists(building):
+            os.remove(building)  # остаток прерванного переноса
+        try:
+            checksum = _build_partition(building, get_connection_manager().database, year)
+            if checksum[0] == 0:
+                raise ValueError(f"За {year} год нет операций.")
+            os.replace(building, path)
+        finally:
+            if os.path.exists(building):
+                os.remove(building)
+
+        stored_path = os.path.relpath(path, base) if os.path.commonpath([path, base]) == base else path
+        period = (f"{year}-01-01", f"{year}-12-31")
+        try:
+            with transaction() as conn:
+                current = tuple(conn.execute(CHECKSUM_SQL.format(table="main.operations"), period).fetchone())
+                if current != checksum:
+                    raise ValueError(f"Операции за {year} год изменились во время переноса, повторите его.")
+                for trigger in AGGREGATE_DELETE_TRIGGERS:
+                    conn.execute(f"DROP TRIGGER {trigger}")
+                conn.execute("DELETE FROM operations WHERE operation_date BETWEEN ? AND ?", period)
+                for statement in AGGREGATE_DELETE_TRIGGERS.values():
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO archive_partitions (year, path, op_count) VALUES (?, ?, ?)",
+                    (year, stored_path, checksum[0])
+                )
+        except BaseException:
+            os.remove(path)
+            raise
+        partitions_cache.invalidate()
+        if vacuum:
+            conn.execute("VACUUM")
+        return partitions_cache.get(year)
+
+    def closing_balances(self, year: int) -> Dict[int, Decimal]:
+        """Балансы счетов на 31 декабря архивного года, сохраненные в разделе."""
+        partition = partitions_cache.get(year)
+        if partition is None:
+            raise ValueError(f"{year} год не перенесен в архив.")
+        conn = get_db_connection()
+        _attach(conn, [partition])
+        rows = conn.execute(
+            f"SELECT account_id, balance, currency FROM {ARCHIVE_SCHEMA.format(year=year)}.closing_balances"
+        ).fetchall()
+        return {row['account_id']: from_minor(row['balance'], row['currency']) for row in rows}
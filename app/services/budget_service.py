@@ -0,0 +1,117 @@
+
+import re
+from typing import List, Optional
+
+from app.db.database import get_db_connection, transaction
+from app.db.profiler import profile_methods
+from app.models.budget import Budget, BudgetProgress
+from app.models.category import Category, OperationType
+from app.models.money import DEFAULT_CURRENCY, Amount, from_minor, to_minor
+
+_MONTH_FORMAT = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+def _check_month(month: str):
+    if not _MONTH_FORMAT.match(month):
+        raise ValueError(f"Месяц должен быть в формате YYYY-MM: {month!r}")
+
+def _row_to_budget(row) -> Budget:
+    return Budget(
+        id=row['id'],
+        category_id=row['category_id'],
+        month=row['month'],
+        limit=from_minor(row['limit_amount'], row['currency']),
+        currency=row['currency']
+    )
+
+@profile_methods
+class BudgetService:
+    """Сервис для управления бюджетами категорий с использованием БД."""
+
+    def create_budget(
+        self, category_id: int, month: str, limit: Amount, currency: str = DEFAULT_CURRENCY
+    ) -> Budget:
+        """Создает бюджет категории на месяц в БД."""
+        _check_month(month)
+        limit_amount = to_minor(limit, currency)
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO budgets (category_id, month, limit_amount, currency) VALUES (?, ?, ?, ?)",
+                (category_id, month, limit_amount, currency)
+            )
+            new_id = cursor.lastrowid
+        return Budget(
+            id=new_id, category_id=category_id, month=month,
+            limit=from_minor(limit_amount, currency), currency=currency
+        )
+
+    def get_budgets(self, month: str) -> List[Budget]:
+        """Возвращает бюджеты на месяц из БД."""
+        _check_month(month)
+        conn = get_db_connection()
+        rows = conn.execute("SELECT * FROM budgets WHERE month = ? ORDER BY id", (month,)).fetchall()
+        return [_row_to_budget(row) for row in rows]
+
+    def update_budget_limit(self, budget_id: int, limit: Amount) -> Optional[Budget]:
+        """Меняет лимит бюджета в БД."""
+        with transaction() as conn:
+            row = conn.execute("SELECT currency FROM budgets WHERE id = ?", (budget_id,)).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE budgets SET limit_amount = ? WHERE id = ?",
+                (to_minor(limit, row['currency']), budget_id)
+            )
+            updated = conn.execute("SELECT * FROM budgets WHERE id = ?", (budget_id,)).fetchone()
+        return _row_to_budget(updated)
+
+    def delete_budget(self, budget_id: int) -> bool:
+        """Удаляет бюджет из БД."""
+        with transaction() as conn:
+            cursor = conn.execute("DELETE FROM budgets WHERE id = ?", (budget_id,))
+            deleted_rows = cursor.rowcount
+        return deleted_rows > 0
+
+    def get_progress(self, month: str) -> List[BudgetProgress]:
+        """Возвращает исполнение всех бюджетов месяца.
+
+        Потраченное берется из помесячных итогов monthly_totals, которые
+        триггеры обновляют при каждой записи операций, поэтому запрос читает
+        по несколько строк итогов на бюджет и не суммирует операции месяца.
+        """
+        _check_month(month)
+        conn = get_db_connection()
+        rows = conn.execute(
+            """SELECT b.*, c.name AS category_name, c.operation_type AS category_type,
+                      COALESCE((
+                          SELECT SUM(t.amount)
+                          FROM monthly_totals t JOIN accounts a ON a.id = t.account_id
+                          WHERE t.month = b.month AND t.category_id = b.category_id
+                            AND t.operation_type = 'expense' AND a.currency = b.currency
+                      ), 0) AS spent
+               FROM budgets b JOIN categories c ON c.id = b.category_id
+               WHERE b.month = ?
+               ORDER BY c.name""",
+            (month,)
+        ).fetchall()
+
+        progress = []
+        for row in rows:
+            budget = _row_to_budget(row)
+            currency = row['currency']
+            limit_amount, spent = row['limit_amount'], row['spent']
+            if limit_amount > 0:
+                percentage = spent * 100 / limit_amount
+            else:
+                percentage = 100.0 if spent > 0 else 0.0
+            progress.append(BudgetProgress(
+                budget=budget,
+                category=Category(
+                    id=row['category_id'],
+                    name=row['category_name'],
+                    operation_type=OperationType(row['category_type'])
+                ),
+                spent=from_minor(spent, currency),
+                remaining=from_minor(limit_amount - spent, currency),
+                percentage=round(percentage, 2)
+            ))
+        return progress
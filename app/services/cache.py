@@ -0,0 +1,97 @@
+
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from app.db.database import get_db_connection
+
+T = TypeVar("T")
+
+
+class TableCache(Generic[T]):
+    """Кэш небольшой справочной таблицы (счета, категории) с индексами.
+
+    Таблица целиком загружается loader'ом при первом обращении и хранится
+    вместе с индексами по id и по дополнительным ключам. Свои изменения
+    сервисы сбрасывают через invalidate(); изменения из других соединений и
+    процессов обнаруживаются по PRAGMA data_version соединения потока.
+    Возвращаемые объекты общие для всех вызывающих — не изменяйте их.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Any], List[T]],
+        indexes: Optional[Dict[str, Callable[[T], Hashable]]] = None,
+    ):
+        self._loader = loader
+        self._index_keys = indexes or {}
+        self._lock = threading.Lock()
+        self._items: Optional[List[T]] = None
+        self._by_id: Dict[int, T] = {}
+        self._indexes: Dict[str, Dict[Hashable, List[T]]] = {}
+        # id(соединения) -> data_version при последней проверке
+        self._versions: Dict[int, int] = {}
+        # Номер загрузки таблицы: меняется при каждом перечитывании (для ETag)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        """Сбрасывает кэш; следующее обращение перечитает таблицу."""
+        with self._lock:
+            self._items = None
+            self.invalidations += 1
+
+    def _check_external_changes(self, conn):
+        # data_version меняется, когда другое соединение фиксирует изменения.
+        # Для соединения, которое кэш еще не видел, момент загрузки неизвестен,
+        # поэтому кэш перечитывается.
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._versions.get(id(conn)) != version:
+            self._versions[id(conn)] = version
+            self._items = None
+
+    def _ensure_loaded(self) -> List[T]:
+        conn = get_db_connection()
+        with self._lock:
+            return self._load(conn)
+
+    def _load(self, conn) -> List[T]:
+        # Вызывается под self._lock
+        self._check_external_changes(conn)
+        if self._items is not None:
+            self.hits += 1
+            return self._items
+        self.misses += 1
+        items = self._loader(conn)
+        self._by_id = {item.id: item for item in items}
+        self._indexes = {}
+        for name, key in self._index_keys.items():
+            index: Dict[Hashable, List[T]] = {}
+            for item in items:
+                index.setdefault(key(item), []).append(item)
+            self._indexes[name] = index
+        self._items = items
+        self.version += 1
+        return items
+
+    def all(self) -> List[T]:
+        return list(self._ensure_loaded())
+
+    def versioned(self) -> Tuple[int, List[T]]:
+        """Возвращает номер загрузки и элементы этой же загрузки."""
+        conn = get_db_connection()
+        with self._lock:
+            return self.version, list(self._load(conn))
+
+    def get(self, item_id: int) -> Optional[T]:
+        self._ensure_loaded()
+        return self._by_id.get(item_id)
+
+    def find(self, index: str, key: Hashable) -> List[T]:
+        """Возвращает элементы с ключом key в индексе index."""
+        self._ensure_loaded()
+        return list(self._indexes[index].get(key, ()))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
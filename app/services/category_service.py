@@ -1,53 +1,49 @@
 
-from typing import List
+from typing import List, Optional
 
-from app.db.database import get_db_connection
+from app.db.database import transaction
+from app.db.profiler import profile_methods
 from app.models.category import Category, OperationType
+from app.services.cache import TableCache
 
+def _load_categories(conn) -> List[Category]:
+    rows = conn.execute("SELECT * FROM categories ORDER BY id").fetchall()
+    # Преобразуем строки в объекты Enum перед созданием объекта Category
+    categories = []
+    for row in rows:
+        row_dict = dict(row)
+        row_dict['operation_type'] = OperationType(row_dict['operation_type'])
+        categories.append(Category(**row_dict))
+    return categories
+
+# Общий для всех экземпляров сервиса кэш категорий с индексом по типу операции
+categories_cache: TableCache[Category] = TableCache(
+    _load_categories, indexes={"type": lambda cat: cat.operation_type}
+)
+
+@profile_methods
 class CategoryService:
     """Сервис для управления категориями с использованием БД."""
 
     def create_category(self, name: str, operation_type: OperationType) -> Category:
         """Создает новую категорию в БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO categories (name, operation_type) VALUES (?, ?)", 
-            (name, operation_type.value)
-        )
-        conn.commit()
-        new_id = cursor.lastrowid
-        conn.close()
+        with transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO categories (name, operation_type) VALUES (?, ?)", 
+                (name, operation_type.value)
+            )
+            new_id = cursor.lastrowid
+        categories_cache.invalidate()
         return Category(id=new_id, name=name, operation_type=operation_type)
 
+    def get_category(self, category_id: int) -> Optional[Category]:
+        """Возвращает категорию по ID (из кэша категорий)."""
+        return categories_cache.get(category_id)
+
     def get_all_categories(self) -> List[Category]:
-        """Возвращает все категории из БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM categories")
-        rows = cursor.fetchall()
-        conn.close()
-        # Преобразуем строки в объекты Enum перед созданием объекта Category
-        categories = []
-        for row in rows:
-            row_dict = dict(row)
-            row_dict['operation_type'] = OperationType(row_dict['operation_type'])
-            categories.append(Category(**row_dict))
-        return categories
+        """Возвращает все категории (из кэша категорий)."""
+        return categories_cache.all()
 
     def get_categories_by_type(self, operation_type: OperationType) -> List[Category]:
-        """Возвращает категории по типу операции из БД."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM categories WHERE operation_type = ?", 
-            (operation_type.value,)
-        )
-        rows = cursor.fetchall()
-        conn.close()
-        categories = []
-        for row in rows:
-            row_dict = dict(row)
-            row_dict['operation_type'] = OperationType(row_dict['operation_type'])
-            categories.append(Category(**row_dict))
-        return categories
+        """Возвращает категории по типу операции (из кэша категорий)."""
+        return categories_cache.find("type", operation_type)
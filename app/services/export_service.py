@@ -0,0 +1,263 @@
+
+import csv
+import json
+import mmap
+import struct
+import sys
+from array import array
+from datetime import date
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO
+
+from app.db.database import get_db_connection
+from app.db.profiler import profile_methods
+from app.models.money import DEFAULT_CURRENCY, from_minor
+from app.models.operation import OperationType
+from app.models.operation_batch import COLUMN_TYPES, COLUMNS, OperationBatch
+from app.services.archive_service import operation_schemas
+from app.services.category_service import categories_cache
+from app.services.operation_service import account_currencies, operation_batches, operation_filters
+
+# Сколько строк за раз читать из курсора при выгрузке
+EXPORT_FETCH_SIZE = 5000
+
+# Колонки текстовых форматов (CSV и JSON Lines)
+EXPORT_COLUMNS = (
+    "id", "date", "type", "amount", "currency", "account_id", "to_account_id", "category_id", "category", "notes",
+)
+
+# Колоночный формат: MAGIC, группы строк, JSON-описание, длина описания (<Q) и снова MAGIC
+COLUMNAR_MAGIC = b"FTCOL001"
+COLUMNAR_VERSION = 1
+_ALIGNMENT = 8
+_TRAILER = struct.Struct("<Q")
+
+
+@profile_methods
+class ExportService:
+    """Выгрузка операций в CSV, JSON Lines и колоночный двоичный формат.
+
+    Фильтры применяются в SQL, курсор читается пачками, поэтому память не
+    зависит от числа выгружаемых операций. Операции выгружаются от старых
+    к новым. Все методы возвращают число выгруженных операций.
+    """
+
+    def export_csv(
+        self,
+        stream: TextIO,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        delimiter: str = ";",
+    ) -> int:
+        """Пишет операции в CSV с заголовком EXPORT_COLUMNS; stream открывайте с newline=""."""
+        writer = csv.writer(stream, delimiter=delimiter)
+        writer.writerow(EXPORT_COLUMNS)
+        exported = 0
+        for chunk in self._text_chunks(account_id, category_id, operation_type, date_from, date_to):
+            writer.writerows(chunk)
+            exported += len(chunk)
+        return exported
+
+    def export_jsonl(
+        self,
+        stream: TextIO,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> int:
+        """Пишет по одному JSON-объекту на операцию; суммы — строками, без потери точности."""
+        exported = 0
+        for chunk in self._text_chunks(account_id, category_id, operation_type, date_from, date_to):
+            stream.write("".join(
+                json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in chunk
+            ))
+            exported += len(chunk)
+        return exported
+
+    def export_columnar(
+        self,
+        stream: BinaryIO,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        fetch_size: int = EXPORT_FETCH_SIZE,
+    ) -> int:
+        """Пишет операции в колоночный формат, который читает ColumnarReader.
+
+        Каждая пачка из fetch_size строк становится группой строк: колонки
+        OperationBatch записываются подряд как есть (array.tofile), заметки —
+        UTF-8 с массивом смещений. Описание групп пишется в конце файла,
+        поэтому число строк заранее знать не нужно.
+        """
+        stream.write(COLUMNAR_MAGIC)
+        position = len(COLUMNAR_MAGIC)
+        groups, currencies, exported = [], {}, 0
+
+        def write_column(data) -> int:
+            nonlocal position
+            offset = position
+            stream.write(data)
+            position += len(data) if isinstance(data, bytes) else len(data) * data.itemsize
+            padding = -position % _ALIGNMENT
+            stream.write(b"\0" * padding)
+            position += padding
+            return offset
+
+        for batch in operation_batches(
+            account_id, category_id, operation_type, date_from, date_to, fetch_size, newest_first=False
+        ):
+            currencies = batch.currencies
+            offsets = {name: write_column(column) for name, column in batch.columns().items()}
+            note_offsets, note_data = array("q", [0]), bytearray()
+            for notes in batch.notes:
+                note_data += (notes or "").encode("utf-8")
+                note_offsets.append(len(note_data))
+            offsets["note_offsets"] = write_column(note_offsets)
+            offsets["note_data"] = write_column(bytes(note_data))
+            groups.append({"rows": len(batch), "offsets": offsets, "notes_size": len(note_data)})
+            exported += len(batch)
+
+        footer = json.dumps({
+            "version": COLUMNAR_VERSION,
+            "byteorder": sys.byteorder,
+            "columns": COLUMN_TYPES,
+            "currencies": {str(account): currency for account, currency in currencies.items()},
+            "groups": groups,
+        }).encode("utf-8")
+        stream.write(footer)
+        stream.write(_TRAILER.pack(len(footer)))
+        stream.write(COLUMNAR_MAGIC)
+        return exported
+
+    def _text_chunks(self, account_id, category_id, operation_type, date_from, date_to) -> Iterator[List[tuple]]:
+        """Строки для текстовых форматов пачками по EXPORT_FETCH_SIZE."""
+        conditions, params = operation_filters(account_id, category_id, operation_type, date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        schemas = operation_schemas(date_from, date_to)
+        selects = [
+            f"""SELECT id, operation_date, operation_type, amount, account_id, to_account_id, category_id, notes
+                FROM {schema}.operations {where}"""
+            for schema in schemas
+        ]
+        cursor = get_db_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(f"{' UNION ALL '.join(selects)} ORDER BY operation_date, id", params * len(schemas))
+        currencies = account_currencies()
+        category_names = {category.id: category.name for category in categories_cache.all()}
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            chunk = []
+            for op_id, op_date, op_type, amount, op_account_id, to_account_id, op_category_id, notes in rows:
+                currency = currencies.get(op_account_id, DEFAULT_CURRENCY)
+                chunk.append((
+                    op_id, op_date, op_type, str(from_minor(amount, currency)), currency, op_account_id,
+                    to_account_id, op_category_id, category_names.get(op_category_id), notes or "",
+                ))
+            yield chunk
+
+
+class _NotesColumn:
+    """Заметки группы строк: декодируются из отображенного файла при обращении."""
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ColumnarReader:
+    """Читает файл export_columnar() через mmap без копирования колонок.
+
+    batches() выдает по OperationBatch на группу строк; колонки в них —
+    memoryview поверх отображенного файла, а не array, и действительны, пока
+    читатель открыт. read_all() копирует все группы в один OperationBatch.
+
+        with ColumnarReader("ops.ftcol") as reader:
+            total = sum(sum(batch.amounts) for batch in reader.batches())
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            self._file.close()
+            raise ValueError(f"Файл {path} не является выгрузкой операций.")
+        self._view = memoryview(self._map)
+        self._header = self._read_header(path)
+        self.currencies: Dict[int, str] = {
+            int(account): currency for account, currency in self._header["currencies"].items()
+        }
+        self.rows = sum(group["rows"] for group in self._header["groups"])
+
+    def _read_header(self, path: str) -> dict:
+        size = len(self._map)
+        magic_size = len(COLUMNAR_MAGIC)
+        if (size < 2 * magic_size + _TRAILER.size or self._map[:magic_size] != COLUMNAR_MAGIC
+                or self._map[size - magic_size:] != COLUMNAR_MAGIC):
+            self.close()
+            raise ValueError(f"Файл {path} не является выгрузкой операций.")
+        (footer_size,) = _TRAILER.unpack_from(self._map, size - magic_size - _TRAILER.size)
+        footer_end = size - magic_size - _TRAILER.size
+        header = json.loads(self._map[footer_end - footer_size:footer_end])
+        if header["version"] != COLUMNAR_VERSION or header["columns"] != COLUMN_TYPES:
+            self.close()
+            raise ValueError(f"Неподдерживаемая версия формата выгрузки в {path}.")
+        return header
+
+    def _column(self, offset: int, typecode: str, length: int):
+        itemsize = array(typecode).itemsize
+        column = self._view[offset:offset + length * itemsize].cast(typecode)
+        if self._header["byteorder"] != sys.byteorder:
+            # Файл с другой платформы: без копии и перестановки байтов не обойтись
+            column = array(typecode, column)
+            column.byteswap()
+        return column
+
+    def batches(self) -> Iterator[OperationBatch]:
+        for group in self._header["groups"]:
+            rows, offsets = group["rows"], group["offsets"]
+            batch = OperationBatch(self.currencies)
+            for name in COLUMNS:
+                setattr(batch, name, self._column(offsets[name], COLUMN_TYPES[name], rows))
+            note_data = offsets["note_data"]
+            batch.notes = _NotesColumn(
+                self._column(offsets["note_offsets"], "q", rows + 1),
+                self._view[note_data:note_data + group["notes_size"]],
+            )
+            yield batch
+
+    def read_all(self) -> OperationBatch:
+        batch = OperationBatch(self.currencies)
+        for group in self.batches():
+            batch.extend(group)
+        return batch
+
+    def close(self):
+        """Закрывает файл; memoryview, полученные из batches(), к этому моменту должны быть освобождены."""
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "ColumnarReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,143 @@
+
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, Optional, TextIO
+
+from app.db.profiler import profile_methods
+from app.models.operation import Operation, OperationType
+from app.services.category_service import CategoryService
+from app.services.operation_service import BULK_CHUNK_SIZE, OperationService
+
+# Колонки банковской выписки по умолчанию
+DEFAULT_CSV_COLUMNS = {
+    "date": "date",
+    "amount": "amount",
+    "description": "description",
+    "category": "category",
+}
+
+
+def parse_amount(raw: str) -> Decimal:
+    """Разбирает сумму из выписки: «-1 234,56», «1234.56», «+100»."""
+    cleaned = raw.replace(" ", "").replace("\u00a0", "").replace(",", ".")
+    try:
+        value = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Некорректная сумма: {raw!r}")
+    if not value.is_finite():
+        # Decimal принимает «NaN» и «Infinity», но суммой они не бывают
+        raise ValueError(f"Некорректная сумма: {raw!r}")
+    return value
+
+
+def _signed_operation(
+    amount: Decimal, operation_date: date, account_id: int, category_id: int, notes: str
+) -> Operation:
+    """Строит операцию по знаковой сумме: минус — расход, плюс — доход."""
+    operation_type = OperationType.EXPENSE if amount < 0 else OperationType.INCOME
+    return Operation(
+        id=None,
+        amount=abs(amount),
+        operation_type=operation_type,
+        operation_date=operation_date,
+        category_id=category_id,
+        account_id=account_id,
+        notes=notes,
+    )
+
+
+def iter_csv_operations(
+    stream: TextIO,
+    account_id: int,
+    default_category_id: int,
+    categories_by_name: Optional[Dict[str, int]] = None,
+    columns: Optional[Dict[str, str]] = None,
+    delimiter: str = ";",
+    date_format: str = "%d.%m.%Y",
+) -> Iterator[Operation]:
+    """Построчно читает CSV-выписку и выдает операции, не загружая файл целиком."""
+    columns = {**DEFAULT_CSV_COLUMNS, **(columns or {})}
+    categories_by_name = categories_by_name or {}
+    reader = csv.DictReader(stream, delimiter=delimiter)
+    for line_no, row in enumerate(reader, start=2):
+        try:
+            amount = parse_amount(row[columns["amount"]])
+            operation_date = datetime.strptime(row[columns["date"]].strip(), date_format).date()
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Строка {line_no}: {e}")
+        category_name = (row.get(columns["category"]) or "").strip()
+        category_id = categories_by_name.get(category_name, default_category_id)
+        notes = (row.get(columns["description"]) or "").strip()
+        yield _signed_operation(amount, operation_date, account_id, category_id, notes)
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)")
+
+
+def iter_ofx_operations(stream: TextIO, account_id: int, default_category_id: int) -> Iterator[Operation]:
+    """Построчно читает транзакции <STMTTRN> из OFX-выписки (SGML и XML)."""
+    current: Optional[Dict[str, str]] = None
+    for line in stream:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            if tag == "STMTTRN":
+                if not closing:
+                    current = {}
+                elif current is not None:
+                    yield _ofx_operation(current, account_id, default_category_id)
+                    current = None
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def _ofx_operation(fields: Dict[str, str], account_id: int, default_category_id: int) -> Operation:
+    try:
+        amount = parse_amount(fields["TRNAMT"])
+        operation_date = datetime.strptime(fields["DTPOSTED"][:8], "%Y%m%d").date()
+    except KeyError as e:
+        raise ValueError(f"В транзакции OFX нет поля {e}")
+    notes = " ".join(part for part in (fields.get("NAME"), fields.get("MEMO")) if part)
+    return _signed_operation(amount, operation_date, account_id, default_category_id, notes)
+
+
+@profile_methods
+class ImportService:
+    """Сервис для импорта банковских выписок."""
+
+    def __init__(self, operation_service: OperationService, category_service: CategoryService):
+        self.operation_service = operation_service
+        self.category_service = category_service
+
+    def import_csv(
+        self,
+        path: str,
+        account_id: int,
+        default_category_id: int,
+        columns: Optional[Dict[str, str]] = None,
+        delimiter: str = ";",
+        date_format: str = "%d.%m.%Y",
+        encoding: str = "utf-8-sig",
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> int:
+        """Импортирует CSV-выписку на счет. Возвращает количество операций."""
+        categories_by_name = {cat.name: cat.id for cat in self.category_service.get_all_categories()}
+        with open(path, newline="", encoding=encoding) as stream:
+            operations = iter_csv_operations(
+                stream, account_id, default_category_id, categories_by_name,
+                columns=columns, delimiter=delimiter, date_format=date_format,
+            )
+            return self.operation_service.add_operations_bulk(operations, chunk_size=chunk_size)
+
+    def import_ofx(
+        self,
+        path: str,
+        account_id: int,
+        default_category_id: int,
+        encoding: str = "utf-8",
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> int:
+        """Импортирует OFX-выписку на счет. Возвращает количество операций."""
+        with open(path, encoding=encoding, errors="replace") as stream:
+            operations = iter_ofx_operations(stream, account_id, default_category_id)
+            return self.operation_service.add_operations_bulk(operations, chunk_size=chunk_size)
@@ -0,0 +1,375 @@
+"""Проверка целостности журнала: балансы счетов и помесячные агрегаты против операций.
+
+Запуск из корня репозитория:
+
+    python -m app.services.integrity_service [--database finance.db] [--workers N] [--full] [--repair]
+        [--confirm-opening ID[=СУММА] ...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.db import database
+from app.db.database import get_connection_manager, get_db_connection, transaction
+from app.db.profiler import profile_methods
+from app.models.integrity import Discrepancy, IntegrityReport
+from app.models.money import Amount, to_minor
+from app.services.account_service import accounts_cache
+from app.services.archive_service import file_uri, partition_file, partitions_cache
+
+# Источник раздела проверки: основная БД (по годам) или архивный раздел года
+MAIN_SOURCE = "main"
+ARCHIVE_SOURCE = "archive"
+
+# Сколько строк за раз читать при подсчете контрольной суммы раздела.
+# Сумма считается по пачкам, поэтому размер пачки — часть ее определения.
+SCAN_FETCH_SIZE = 10000
+
+# Сколько раз пересканировать годы, в которые писали во время проверки
+VERIFY_RETRIES = 3
+
+# Обороты по счетам и месяцам — так же, как их ведут триггеры balance_snapshots
+SNAPSHOT_SQL = """
+    SELECT account_id, month, SUM(delta), COUNT(*) FROM (
+        SELECT account_id, substr(operation_date, 1, 7) AS month,
+               CASE operation_type WHEN 'income' THEN amount ELSE -amount END AS delta
+        FROM operations WHERE operation_date BETWEEN :date_from AND :date_to
+        UNION ALL
+        SELECT to_account_id, substr(operation_date, 1, 7), amount
+        FROM operations WHERE to_account_id IS NOT NULL AND operation_date BETWEEN :date_from AND :date_to
+    )
+    GROUP BY 1, 2
+"""
+
+# Итоги по месяцам, категориям, счетам и типам — как в monthly_totals
+MONTHLY_SQL = """
+    SELECT substr(operation_date, 1, 7), IFNULL(category_id, 0), account_id, operation_type, SUM(amount), COUNT(*)
+    FROM operations WHERE operation_date BETWEEN :date_from AND :date_to
+    GROUP BY 1, 2, 3, 4
+"""
+
+# Раздел проверки: (источник, год)
+Partition = Tuple[str, int]
+
+def scan_partition(uri: str, source: str, year: int) -> dict:
+    """Пересчитывает один год операций в отдельном соединении только для чтения.
+
+    Выполняется в процессах пула, поэтому принимает и возвращает только
+    простые значения. Версия года, контрольная сумма строк и агрегаты
+    читаются в одной транзакции, то есть относятся к одному снимку БД.
+    """
+    period = {"date_from": f"{year:04d}-01-01", "date_to": f"{year:04d}-12-31"}
+    conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        version = 0
+        if source == MAIN_SOURCE:
+            row = conn.execute("SELECT version FROM operation_periods WHERE year = ?", (year,)).fetchone()
+            version = row[0] if row else 0
+        digest, op_count = hashlib.sha256(), 0
+        cursor = conn.execute(
+            """SELECT id, amount, operation_type, operation_date, category_id, account_id, to_account_id
+               FROM operations WHERE operation_date BETWEEN :date_from AND :date_to
+               ORDER BY operation_date, id""",
+            period
+        )
+        while True:
+            rows = cursor.fetchmany(SCAN_FETCH_SIZE)
+            if not rows:
+                break
+            digest.update(repr(rows).encode("utf-8"))
+            op_count += len(rows)
+        totals = {
+            "snapshots": [list(row) for row in conn.execute(SNAPSHOT_SQL, period)],
+            "monthly": [list(row) for row in conn.execute(MONTHLY_SQL, period)],
+        }
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return {
+        "source": source, "year": year, "version": version, "op_count": op_count,
+        "checksum": digest.hexdigest(), "totals": totals,
+    }
+
+@contextmanager
+def _read_snapshot():
+    """Транзакция чтения: все запросы внутри видят один снимок БД."""
+    conn = get_db_connection()
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+def _diff(kind: str, expected: Dict[tuple, tuple], actual: Dict[tuple, tuple], zero: tuple) -> List[Discrepancy]:
+    return [
+        Discrepancy(kind, key, expected.get(key, zero), actual.get(key, zero))
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key, zero) != actual.get(key, zero)
+    ]
+
+@profile_methods
+class IntegrityService:
+    """Проверка и восстановление денормализованных данных журнала.
+
+    accounts.balance, balance_snapshots и monthly_totals пересчитываются по
+    операциям основной БД и архивных разделов. Операции делятся на
+    разделы по годам, разделы сканируются параллельно в пуле процессов,
+    каждый через свое соединение только для чтения. Результат каждого
+    раздела (контрольная сумма строк и агрегаты) сохраняется в
+    integrity_checkpoints вместе с версией года из operation_periods,
+    которую меняют триггеры при любой записи; при повторной проверке
+    заново сканируются только годы с новой версией.
+
+    Баланс счета проверяется как начальный баланс плюс обороты. Для счетов,
+    существовавших до миграции 11, начальный баланс восстановлен из баланса
+    на момент миграции, поэтому расхождения, накопленные до нее, проверка не
+    видит. Такие счета возвращаются в IntegrityReport.unverified_accounts,
+    пока их начальный баланс не подтвержден через confirm_opening_balance().
+    """
+
+    def verify(self, workers: Optional[int] = None, full: bool = False, repair: bool = False) -> IntegrityReport:
+        """Сверяет балансы и агрегаты с операциями и возвращает найденные расхождения.
+
+        full=True сканирует все разделы, даже не изменившиеся, и сверяет их
+        контрольные суммы с сохраненными. repair=True исправляет балансы и
+        агрегаты в одной транзакции записи, в которой заново сверяются версии
+        лет: если операции изменились после сканирования, измененные годы
+        пересканируются.
+        """
+        start = time.perf_counter()
+        main_path = get_connection_manager().database
+        main_uri = file_uri(main_path, "ro")
+        archives = {partition.year: partition for partition in partitions_cache.all()}
+        checkpoints = self._load_checkpoints()
+        scans: Dict[Partition, dict] = {}
+        scanned = 0
+        discrepancies: List[Discrepancy] = []
+
+        def scan(partitions: List[Partition]):
+            nonlocal scanned
+            tasks = [
+                (main_uri if source == MAIN_SOURCE else file_uri(partition_file(archives[year]), "ro"), source, year)
+                for source, year in partitions
+            ]
+            if workers == 1 or len(tasks) < 2:
+                results = [scan_partition(*task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(scan_partition, *zip(*tasks)))
+            for result in results:
+                if result["source"] == ARCHIVE_SOURCE:
+                    # Архивный раздел не меняется; его версия — число операций в нем
+                    result["version"] = archives[result["year"]].op_count
+                scans[(result["source"], result["year"])] = result
+            scanned += len(results)
+
+        versions = self._period_versions(get_db_connection())
+        partitions = [(MAIN_SOURCE, year) for year in versions] + [(ARCHIVE_SOURCE, year) for year in archives]
+        pending = []
+        for source, year in partitions:
+            checkpoint = checkpoints.get((source, year))
+            version = versions.get(year, 0) if source == MAIN_SOURCE else archives[year].op_count
+            if checkpoint is not None and not full and checkpoint["version"] == version:
+                scans[(source, year)] = checkpoint
+            else:
+                pending.append((source, year))
+        reused = len(partitions) - len(pending)
+        scan(pending)
+        if full:
+            discrepancies += [
+                Discrepancy("checksum", partition, (checkpoint["checksum"],), (scans[partition]["checksum"],))
+                for partition, checkpoint in checkpoints.items()
+                if partition in scans and checkpoint["version"] == scans[partition]["version"]
+                and checkpoint["checksum"] != scans[partition]["checksum"]
+            ]
+
+        # Годы, в которые писали после сканирования, пересканируются. Сверка
+        # идет в одной транзакции с проверкой версий (при repair — в транзакции записи).
+        for _ in range(VERIFY_RETRIES):
+            with (transaction() if repair else _read_snapshot()) as conn:
+                stale = [
+                    (MAIN_SOURCE, year) for year, version in self._period_versions(conn).items()
+                    if scans.get((MAIN_SOURCE, year), {}).get("version") != version
+                ]
+                if not stale:
+                    found = self._compare(conn, scans)
+                    unverified = [
+                        row[0] for row in conn.execute("SELECT id FROM accounts WHERE opening_verified = 0 ORDER BY id")
+                    ]
+                    if repair:
+                        self._repair(conn, found)
+                        self._save_checkpoints(conn, scans, checkpoints)
+            if not stale:
+                break
+            scan(stale)
+        else:
+            raise ValueError("Операции менялись во время каждой попытки проверки, повторите ее позже.")
+
+        if repair:
+            accounts_cache.invalidate()
+        else:
+            with transaction() as conn:
+                self._save_checkpoints(conn, scans, checkpoints)
+        discrepancies += found
+        return IntegrityReport(
+            partitions=len(partitions),
+            scanned=scanned,
+            reused=reused,
+            operations=sum(result["op_count"] for result in scans.values()),
+            discrepancies=discrepancies,
+            unverified_accounts=unverified,
+            repaired=repair and bool(found),
+            seconds=time.perf_counter() - start,
+        )
+
+    def confirm_opening_balance(self, account_id: int, opening_balance: Optional[Amount] = None) -> bool:
+        """Подтверждает начальный баланс счета, восстановленный миграцией.
+
+        opening_balance — настоящий начальный баланс (например, из выписки);
+        если не задан, подтверждается текущий. После этого verify() сверяет
+        баланс счета с ним, а repair=True пересчитывает баланс от него.
+        """
+        account = accounts_cache.get(account_id)
+        if account is None:
+            return False
+        with transaction() as conn:
+            if opening_balance is None:
+                conn.execute("UPDATE accounts SET opening_verified = 1 WHERE id = ?", (account_id,))
+            else:
+                conn.execute(
+                    "UPDATE accounts SET opening_balance = ?, opening_verified = 1 WHERE id = ?",
+                    (to_minor(opening_balance, account.currency), account_id)
+                )
+        return True
+
+    def _period_versions(self, conn) -> Dict[int, int]:
+        return {row['year']: row['version'] for row in conn.execute("SELECT year, version FROM operation_periods")}
+
+    def _load_checkpoints(self) -> Dict[Partition, dict]:
+        conn = get_db_connection()
+        return {
+            (row['source'], row['year']): {
+                "source": row['source'], "year": row['year'], "version": row['version'],
+                "op_count": row['op_count'], "checksum": row['checksum'], "totals": json.loads(row['totals']),
+            }
+            for row in conn.execute("SELECT * FROM integrity_checkpoints")
+        }
+
+    def _save_checkpoints(self, conn, scans: Dict[Partition, dict], checkpoints: Dict[Partition, dict]):
+        rows = [
+            (source, year, result["version"], result["op_count"], result["checksum"], json.dumps(result["totals"]))
+            for (source, year), result in scans.items()
+            if checkpoints.get((source, year)) is not result
+        ]
+        conn.executemany(
+            """INSERT OR REPLACE INTO integrity_checkpoints (source, year, version, op_count, checksum, totals)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        conn.execute(
+            "DELETE FROM integrity_checkpoints WHERE source = ? AND year NOT IN (SELECT year FROM operation_periods)",
+            (MAIN_SOURCE,)
+        )
+
+    def _compare(self, conn, scans: Dict[Partition, dict]) -> List[Discrepancy]:
+        """Сверяет хранимые балансы и агрегаты с суммой результатов всех разделов."""
+        snapshots: Dict[tuple, tuple] = {}
+        monthly: Dict[tuple, tuple] = {}
+        deltas: Dict[int, int] = {}
+        for result in scans.values():
+            for account_id, month, delta, count in result["totals"]["snapshots"]:
+                old_delta, old_count = snapshots.get((account_id, month), (0, 0))
+                snapshots[(account_id, month)] = (old_delta + delta, old_count + count)
+                deltas[account_id] = deltas.get(account_id, 0) + delta
+            for month, category_id, account_id, operation_type, amount, count in result["totals"]["monthly"]:
+                key = (month, category_id, account_id, operation_type)
+                old_amount, old_count = monthly.get(key, (0, 0))
+                monthly[key] = (old_amount + amount, old_count + count)
+
+        accounts = {row['id']: row for row in conn.execute("SELECT id, balance, opening_balance FROM accounts")}
+        balances = {
+            (account_id,): (row['opening_balance'] + deltas.get(account_id, 0),) for account_id, row in accounts.items()
+        }
+        found = _diff("balance", balances, {(row['id'],): (row['balance'],) for row in accounts.values()}, (0,))
+        found += [
+            Discrepancy("orphan", (account_id,), (delta,), ())
+            for account_id, delta in sorted(deltas.items()) if account_id not in accounts
+        ]
+        found += _diff("snapshot", snapshots, {
+            (row[0], row[1]): (row[2], row[3])
+            for row in conn.execute("SELECT account_id, month, delta, op_count FROM balance_snapshots")
+        }, (0, 0))
+        found += _diff("monthly_total", monthly, {
+            tuple(row[:4]): (row[4], row[5])
+            for row in conn.execute(
+                "SELECT month, category_id, account_id, operation_type, amount, op_count FROM monthly_totals"
+            )
+        }, (0, 0))
+        return found
+
+    def _repair(self, conn, found: List[Discrepancy]):
+        """Записывает пересчитанные значения; операции удаленных счетов не трогаются."""
+        for item in found:
+            if item.kind == "balance":
+                conn.execute("UPDATE accounts SET balance = ? WHERE id = ?", (*item.expected, *item.key))
+            elif item.kind == "snapshot":
+                conn.execute(
+                    """INSERT INTO balance_snapshots (account_id, month, delta, op_count) VALUES (?, ?, ?, ?)
+                       ON CONFLICT (account_id, month) DO UPDATE
+                           SET delta = excluded.delta, op_count = excluded.op_count""",
+                    (*item.key, *item.expected)
+                )
+            elif item.kind == "monthly_total":
+                conn.execute(
+                    """INSERT INTO monthly_totals (month, category_id, account_id, operation_type, amount, op_count)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (month, category_id, account_id, operation_type) DO UPDATE
+                           SET amount = excluded.amount, op_count = excluded.op_count""",
+                    (*item.key, *item.expected)
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=database.DATABASE_FILE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="число процессов пула")
+    parser.add_argument("--full", action="store_true", help="сканировать и неизмененные разделы")
+    parser.add_argument("--repair", action="store_true", help="исправить найденные расхождения")
+    parser.add_argument("--confirm-opening", action="append", default=[], metavar="ID[=СУММА]",
+                        help="подтвердить начальный баланс счета (или задать его) перед проверкой")
+    args = parser.parse_args()
+
+    database.set_database(args.database)
+    database.init_database()
+    service = IntegrityService()
+    for value in args.confirm_opening:
+        account_id, _, amount = value.partition("=")
+        if not service.confirm_opening_balance(int(account_id), amount or None):
+            parser.error(f"счет {account_id} не найден")
+    report = service.verify(workers=args.workers, full=args.full, repair=args.repair)
+    print(f"разделов: {report.partitions}, просканировано: {report.scanned}, из кэша: {report.reused}, "
+          f"операций: {report.operations}, {report.seconds:.2f} с")
+    for item in report.discrepancies:
+        print(f"  {item.kind:<14} {item.key}: ожидалось {item.expected}, в БД {item.actual}")
+    if report.ok:
+        print("расхождений нет")
+    elif report.repaired:
+        print(f"исправлено расхождений: {len(report.discrepancies)}")
+    if report.unverified_accounts:
+        print(f"начальный баланс не подтвержден (счета {', '.join(map(str, report.unverified_accounts))}): "
+              "расхождения до миграции 11 не проверены, см. --confirm-opening")
+    database.get_connection_manager().close_all()
+    sys.exit(0 if report.ok or report.repaired else 1)
+
+
+if __name__ == "__main__":
+    main()
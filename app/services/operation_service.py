@@ -1,81 +1,450 @@
 
 from datetime import date
-from decimal import Decimal
-from typing import List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from app.db.database import get_db_connection
-from app.models.operation import Operation, OperationType
+from app.db.database import get_db_connection, transaction
+from app.db.profiler import profile_methods
+from app.models.money import DEFAULT_CURRENCY, Amount, from_minor, to_minor
+from app.models.operation import Operation, OperationType, SearchResult
+from app.models.operation_batch import NO_ID, TYPE_CODES, OperationBatch
+from app.services.account_service import accounts_cache
+from app.services.archive_service import OPERATION_COLUMNS, operation_schemas
 
-class OperationService:
+# Размер пачки строк для executemany при массовой загрузке
+BULK_CHUNK_SIZE = 5000
 
-    def add_operation(
-        self, 
-        amount: float, 
-        description: str, 
-        account_id: int, 
-        category_id: int, 
-        operation_type: OperationType, 
-        operation_date: date = date.today()
-    ) -> Optional[Operation]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+INSERT_OPERATION_SQL = (
+    "INSERT INTO operations (amount, operation_type, operation_date, category_id, account_id, notes, to_account_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Атомарное изменение баланса: без чтения и записи значения из Python
+UPDATE_BALANCE_SQL = "UPDATE accounts SET balance = balance + ? WHERE id = ?"
+
+# Размер страницы истории операций по умолчанию
+DEFAULT_PAGE_SIZE = 100
+
+# Сколько строк за раз читать из курсора при сборке OperationBatch
+BATCH_FETCH_SIZE = 10000
+
+# julianday(дата) - JULIAN_ORDINAL_OFFSET == date.toordinal()
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Границы совпадения во фрагменте заметки и длина фрагмента в словах
+SNIPPET_MARKERS = ("[", "]")
+SNIPPET_TOKENS = 12
+
+# Курсор страницы: (дата, id) последней операции предыдущей страницы
+PageCursor = Tuple[date, int]
+
+def operation_filters(
+    account_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    operation_type: Optional[OperationType] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Tuple[List[str], list]:
+    """Собирает условия WHERE и параметры для фильтров по операциям.
 
-        try:
-            cursor.execute("BEGIN TRANSACTION")
+    Фильтр по счету учитывает и переводы, зачисленные на этот счет.
+    """
+    conditions, params = [], []
+    if account_id is not None:
+        conditions.append("(account_id = ? OR to_account_id = ?)")
+        params.extend((account_id, account_id))
+    if category_id is not None:
+        conditions.append("category_id = ?")
+        params.append(category_id)
+    if operation_type is not None:
+        conditions.append("operation_type = ?")
+        params.append(operation_type.value)
+    if date_from is not None:
+        conditions.append("operation_date >= ?")
+        params.append(date_from.isoformat())
+    if date_to is not None:
+        conditions.append("operation_date <= ?")
+        params.append(date_to.isoformat())
+    return conditions, params
 
-            cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
-            row = cursor.fetchone()
-            if not row:
-                raise ValueError(f"Счет с ID {account_id} не найден.")
-            
-            current_balance = Decimal(row['balance'])
-            operation_amount = Decimal(amount)
+def balance_deltas(
+    operation_type: OperationType, account_id: int, to_account_id: Optional[int], amount: int
+) -> List[Tuple[int, int]]:
+    """Возвращает изменения балансов [(счет, дельта)] для операции в минорных единицах."""
+    if operation_type == OperationType.INCOME:
+        return [(account_id, amount)]
+    if operation_type == OperationType.EXPENSE:
+        return [(account_id, -amount)]
+    if operation_type == OperationType.TRANSFER:
+        if to_account_id is None:
+            raise ValueError("Для перевода нужен счет зачисления.")
+        if to_account_id == account_id:
+            raise ValueError("Нельзя перевести деньги на тот же счет.")
+        return [(account_id, -amount), (to_account_id, amount)]
+    raise ValueError(f"Неподдерживаемый тип операции: {operation_type}")
 
-            if operation_type == OperationType.EXPENSE:
-                new_balance = current_balance - operation_amount
-            elif operation_type == OperationType.INCOME:
-                new_balance = current_balance + operation_amount
+def account_currencies() -> Dict[int, str]:
+    """Валюты счетов: по ним суммы операций переводятся из минорных единиц."""
+    return {acc.id: acc.currency for acc in accounts_cache.all()}
 
-            cursor.execute("UPDATE accounts SET balance = ? WHERE id = ?", (str(new_balance), account_id))
+def operation_batches(
+    account_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    operation_type: Optional[OperationType] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    fetch_size: int = BATCH_FETCH_SIZE,
+    newest_first: bool = True,
+) -> Iterator[OperationBatch]:
+    """Читает отфильтрованные операции пачками: не более fetch_size строк в OperationBatch.
 
-            cursor.execute(
-                "INSERT INTO operations (amount, operation_type, operation_date, category_id, account_id, notes) VALUES (?, ?, ?, ?, ?, ?)",
-                (str(amount), operation_type.value, operation_date.isoformat(), category_id, account_id, description)
+    Даты и коды типов вычисляет SQLite, строки читаются обычными кортежами
+    и сразу раскладываются по массивам колонок. В памяти одновременно
+    находится только одна пачка. Архивные разделы, пересекающиеся с
+    периодом, читаются отдельными ветвями UNION ALL: каждая идет по индексу
+    даты, и SQLite сливает их без общей сортировки.
+    """
+    conditions, params = operation_filters(account_id, category_id, operation_type, date_from, date_to)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "DESC" if newest_first else "ASC"
+    type_codes = " ".join(f"WHEN '{op_type.value}' THEN {code}" for op_type, code in TYPE_CODES.items())
+    schemas = operation_schemas(date_from, date_to)
+    # Девятая колонка (operation_date) нужна только для сортировки, extend_rows ее отбрасывает
+    selects = [
+        f"""SELECT id, amount,
+                   CAST(julianday(operation_date) - {JULIAN_ORDINAL_OFFSET} AS INTEGER),
+                   CASE operation_type {type_codes} END,
+                   COALESCE(category_id, {NO_ID}), account_id, COALESCE(to_account_id, {NO_ID}), notes,
+                   operation_date
+            FROM {schema}.operations {where}"""
+        for schema in schemas
+    ]
+    cursor = get_db_connection().cursor()
+    cursor.row_factory = None # Обычные кортежи вместо sqlite3.Row
+    cursor.execute(f"{' UNION ALL '.join(selects)} ORDER BY 9 {order}, 1 {order}", params * len(schemas))
+    currencies = account_currencies()
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        batch = OperationBatch(currencies)
+        batch.extend_rows(rows)
+        yield batch
+
+def fts_query(text: str) -> str:
+    """Превращает пользовательский ввод в запрос FTS5: все слова, каждое как префикс.
+
+    Слова берутся в кавычки, поэтому символы синтаксиса FTS5 во вводе не
+    вызывают ошибок. «ё» заменяется на «е», как и в индексе. Пустая строка
+    означает, что искать нечего.
+    """
+    words = text.replace("ё", "е").replace("Ё", "Е").split()
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+def _account_currency(account_id: int) -> str:
+    account = accounts_cache.get(account_id)
+    if account is None:
+        raise ValueError(f"Счет с ID {account_id} не найден.")
+    return account.currency
+
+def _row_to_operation(row, currencies: Dict[int, str]) -> Operation:
+    return Operation(
+        id=row['id'],
+        amount=from_minor(row['amount'], currencies.get(row['account_id'], DEFAULT_CURRENCY)),
+        operation_type=OperationType(row['operation_type']),
+        operation_date=date.fromisoformat(row['operation_date']),
+        category_id=row['category_id'],
+        account_id=row['account_id'],
+        notes=row['notes'],
+        to_account_id=row['to_account_id']
+    )
+
+@profile_methods
+class OperationService:
+
+    def add_operation(
+        self,
+        amount: Amount,
+        description: str,
+        account_id: int,
+        category_id: int,
+        operation_type: OperationType,
+        operation_date: Optional[date] = None
+    ) -> Optional[Operation]:
+        """Добавляет доход или расход и атомарно меняет баланс счета."""
+        if operation_type == OperationType.TRANSFER:
+            raise ValueError("Для переводов используйте transfer().")
+        operation_date = operation_date or date.today()
+        with transaction() as conn:
+            currency = _account_currency(account_id)
+            minor_amount = to_minor(amount, currency)
+            for delta_account_id, delta in balance_deltas(operation_type, account_id, None, minor_amount):
+                conn.execute(UPDATE_BALANCE_SQL, (delta, delta_account_id))
+            cursor = conn.execute(
+                INSERT_OPERATION_SQL,
+                (minor_amount, operation_type.value, operation_date.isoformat(), category_id, account_id,
+                 description, None)
             )
             new_op_id = cursor.lastrowid
+        accounts_cache.invalidate()
 
-            conn.commit()
+        return Operation(
+            id=new_op_id,
+            amount=from_minor(minor_amount, currency),
+            operation_type=operation_type,
+            operation_date=operation_date,
+            category_id=category_id,
+            account_id=account_id,
+            notes=description
+        )
 
-            return Operation(
-                id=new_op_id, 
-                amount=operation_amount, 
-                operation_type=operation_type, 
-                operation_date=operation_date, 
-                category_id=category_id, 
-                account_id=account_id, 
-                notes=description
+    def transfer(
+        self,
+        amount: Amount,
+        from_account_id: int,
+        to_account_id: int,
+        description: str = "",
+        operation_date: Optional[date] = None,
+        category_id: Optional[int] = None,
+    ) -> Operation:
+        """Переводит деньги между счетами одной валюты в одной транзакции."""
+        operation_date = operation_date or date.today()
+        with transaction() as conn:
+            currency = _account_currency(from_account_id)
+            if _account_currency(to_account_id) != currency:
+                raise ValueError("Перевод возможен только между счетами в одной валюте.")
+            minor_amount = to_minor(amount, currency)
+            if minor_amount <= 0:
+                raise ValueError("Сумма перевода должна быть положительной.")
+            for delta_account_id, delta in balance_deltas(
+                OperationType.TRANSFER, from_account_id, to_account_id, minor_amount
+            ):
+                conn.execute(UPDATE_BALANCE_SQL, (delta, delta_account_id))
+            cursor = conn.execute(
+                INSERT_OPERATION_SQL,
+                (minor_amount, OperationType.TRANSFER.value, operation_date.isoformat(), category_id,
+                 from_account_id, description, to_account_id)
             )
+            new_op_id = cursor.lastrowid
+        accounts_cache.invalidate()
+
+        return Operation(
+            id=new_op_id,
+            amount=from_minor(minor_amount, currency),
+            operation_type=OperationType.TRANSFER,
+            operation_date=operation_date,
+            category_id=category_id,
+            account_id=from_account_id,
+            notes=description,
+            to_account_id=to_account_id
+        )
 
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+    def add_operations_bulk(self, operations: Iterable[Operation], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """Добавляет поток операций одной транзакцией.
+
+        Строки вставляются пачками по chunk_size через executemany, поле id
+        входных операций игнорируется. Изменения балансов суммируются по счетам
+        и применяются одним атомарным UPDATE на счет в конце транзакции.
+        Возвращает количество добавленных операций.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size должен быть положительным.")
+
+        deltas: Dict[int, int] = {}
+
+        def rows(currencies):
+            for op in operations:
+                currency = currencies.get(op.account_id)
+                if currency is None:
+                    raise ValueError(f"Счет с ID {op.account_id} не найден.")
+                if op.to_account_id is not None and currencies.get(op.to_account_id) != currency:
+                    raise ValueError("Перевод возможен только между счетами в одной валюте.")
+                amount = to_minor(op.amount, currency)
+                if op.operation_type == OperationType.TRANSFER and amount <= 0:
+                    raise ValueError("Сумма перевода должна быть положительной.")
+                for account_id, delta in balance_deltas(op.operation_type, op.account_id, op.to_account_id, amount):
+                    deltas[account_id] = deltas.get(account_id, 0) + delta
+                yield (
+                    amount, op.operation_type.value, op.operation_date.isoformat(),
+                    op.category_id, op.account_id, op.notes, op.to_account_id
+                )
+
+        inserted = 0
+        with transaction() as conn:
+            stream = rows(account_currencies())
+            while True:
+                chunk = list(islice(stream, chunk_size))
+                if not chunk:
+                    break
+                conn.executemany(INSERT_OPERATION_SQL, chunk)
+                inserted += len(chunk)
+
+            conn.executemany(UPDATE_BALANCE_SQL, [(delta, account_id) for account_id, delta in deltas.items()])
+        accounts_cache.invalidate()
+        return inserted
+
+    def get_operations_batch(
+        self,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        fetch_size: int = BATCH_FETCH_SIZE,
+    ) -> OperationBatch:
+        """Возвращает операции от новых к старым в колоночном виде OperationBatch.
+
+        Объекты Operation, Decimal и date на строку не создаются
+        (см. operation_batches).
+        """
+        batch = OperationBatch(account_currencies())
+        for chunk in operation_batches(account_id, category_id, operation_type, date_from, date_to, fetch_size):
+            batch.extend(chunk)
+        return batch
 
     def get_all_operations(self) -> List[Operation]:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM operations ORDER BY operation_date DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        currencies = account_currencies()
+        selects = [f"SELECT {OPERATION_COLUMNS} FROM {schema}.operations" for schema in operation_schemas()]
+        rows = conn.execute(f"{' UNION ALL '.join(selects)} ORDER BY operation_date DESC, id DESC").fetchall()
+        return [_row_to_operation(row, currencies) for row in rows]
+
+    def get_operations_page(
+        self,
+        cursor: Optional[PageCursor] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> Tuple[List[Operation], Optional[PageCursor]]:
+        """Возвращает страницу операций от новых к старым и курсор следующей страницы.
+
+        Пагинация по ключу (operation_date, id): стоимость запроса зависит
+        только от размера страницы, а не от смещения. Курсор равен None,
+        когда страниц больше нет.
+
+        Сначала страница читается из основной БД. Архивные разделы
+        добавляются, только если их годы могут попасть на страницу: не
+        позже даты курсора и не раньше последней найденной в основной БД строки.
+        """
+        if limit < 1:
+            raise ValueError("limit должен быть положительным.")
+        conditions, params = operation_filters(None, category_id, operation_type, date_from, date_to)
+        archive_to = date_to
+        if cursor is not None:
+            cursor_date, cursor_id = cursor
+            conditions.append("(operation_date, id) < (?, ?)")
+            params.extend((cursor_date.isoformat(), cursor_id))
+            archive_to = min(date_to, cursor_date) if date_to is not None else cursor_date
+
+        if account_id is None:
+            branches = [(conditions, params)]
+        else:
+            # Списания и зачисления ищем по своим индексам и сливаем две
+            # уже отсортированные страницы, чтобы не сортировать всю историю счета
+            branches = [
+                (["account_id = ?", *conditions], [account_id, *params]),
+                (["to_account_id = ?", *conditions], [account_id, *params]),
+            ]
+
+        def page_rows(schemas):
+            selects, query_params = [], []
+            for schema in schemas:
+                for branch_conditions, branch_params in branches:
+                    where = f"WHERE {' AND '.join(branch_conditions)}" if branch_conditions else ""
+                    selects.append(
+                        f"SELECT * FROM (SELECT {OPERATION_COLUMNS} FROM {schema}.operations {where} "
+                        f"ORDER BY operation_date DESC, id DESC LIMIT ?)"
+                    )
+                    query_params.extend((*branch_params, limit + 1))
+            return get_db_connection().execute(
+                f"{' UNION ALL '.join(selects)} ORDER BY operation_date DESC, id DESC LIMIT ?",
+                (*query_params, limit + 1)
+            ).fetchall()
+
+        rows = page_rows(["main"])
+        archive_from = date_from
+        if len(rows) > limit:
+            # Годы старше последней строки основной БД на эту страницу уже не попадут
+            last_date = date.fromisoformat(rows[limit]['operation_date'])
+            archive_from = max(date_from, last_date) if date_from is not None else last_date
+        schemas = operation_schemas(archive_from, archive_to)
+        if len(schemas) > 1:
+            rows = page_rows(schemas)
+        currencies = account_currencies()
+        operations = [_row_to_operation(row, currencies) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = operations[-1]
+            next_cursor = (last.operation_date, last.id)
+        return operations, next_cursor
+
+    def get_operations_by_account(self, account_id: int, limit: Optional[int] = None) -> List[Operation]:
+        """Возвращает операции по счету, включая входящие переводы, от новых к старым.
+
+        Если задан limit, возвращается не более limit операций.
+        """
+        if limit is not None:
+            operations, _ = self.get_operations_page(limit=limit, account_id=account_id)
+            return operations
+        schemas = operation_schemas()
+        selects = [
+            f"SELECT {OPERATION_COLUMNS} FROM {schema}.operations WHERE {column} = ?"
+            for schema in schemas for column in ("account_id", "to_account_id")
+        ]
+        conn = get_db_connection()
+        rows = conn.execute(
+            f"{' UNION ALL '.join(selects)} ORDER BY operation_date DESC, id DESC",
+            (account_id,) * len(selects)
+        ).fetchall()
+        currencies = account_currencies()
+        return [_row_to_operation(row, currencies) for row in rows]
+
+    def search(
+        self,
+        query: str,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0,
+    ) -> List[SearchResult]:
+        """Ищет операции по словам заметки через полнотекстовый индекс operations_fts.
+
+        Каждое слово запроса ищется как префикс, результаты упорядочены по
+        релевантности bm25, затем от новых к старым. Фильтры те же, что у
+        get_operations_page(); страницы задаются limit и offset. В архивных
+        разделах поиск идет по их собственным индексам заметок.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        conditions, params = operation_filters(account_id, category_id, operation_type, date_from, date_to)
+        # Колонки фильтров есть только в operations, поэтому имена не конфликтуют с operations_fts.
+        # CROSS JOIN закрепляет порядок: сначала совпадения из индекса, потом строки операций
+        where = "".join(f" AND {condition}" for condition in conditions)
+        columns = ", ".join(f"o.{column}" for column in OPERATION_COLUMNS.split(", "))
+        schemas = operation_schemas(date_from, date_to)
+        selects = [
+            f"""SELECT {columns}, snippet(operations_fts, 0, ?, ?, '…', ?) AS snippet,
+                       bm25(operations_fts) AS score
+                FROM {schema}.operations_fts CROSS JOIN {schema}.operations o ON o.id = operations_fts.rowid
+                WHERE operations_fts MATCH ?{where}"""
+            for schema in schemas
+        ]
+        conn = get_db_connection()
+        rows = conn.execute(
+            f"""{' UNION ALL '.join(selects)}
+                ORDER BY score, operation_date DESC, id DESC
+                LIMIT ? OFFSET ?""",
+            (*SNIPPET_MARKERS, SNIPPET_TOKENS, match, *params) * len(schemas) + (limit, offset)
+        ).fetchall()
+        currencies = account_currencies()
         return [
-            Operation(
-                id=row['id'],
-                amount=Decimal(row['amount']),
-                operation_type=OperationType(row['operation_type']),
-                operation_date=date.fromisoformat(row['operation_date']),
-                category_id=row['category_id'],
-                account_id=row['account_id'],
-                notes=row['notes']
-            ) for row in rows
+            SearchResult(operation=_row_to_operation(row, currencies), snippet=row['snippet'], rank=row['score'])
+            for row in rows
         ]
@@ -0,0 +1,182 @@
+
+from datetime import date
+from itertools import islice
+from typing import Dict, List, Optional
+
+from app.db.database import get_db_connection, transaction
+from app.db.profiler import profile_methods
+from app.models.money import DEFAULT_CURRENCY, Amount, from_minor, to_minor
+from app.models.operation import OperationType
+from app.models.recurring import Frequency, RecurringRule
+from app.services.account_service import accounts_cache
+from app.services.operation_service import BULK_CHUNK_SIZE, UPDATE_BALANCE_SQL, balance_deltas
+
+# Повтор правила вставляется, только если его еще нет (уникальный индекс по rule_id и дате)
+INSERT_OCCURRENCE_SQL = (
+    "INSERT INTO operations "
+    "(amount, operation_type, operation_date, category_id, account_id, notes, to_account_id, rule_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (rule_id, operation_date) WHERE rule_id IS NOT NULL DO NOTHING"
+)
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+def _row_to_rule(row) -> RecurringRule:
+    account = accounts_cache.get(row['account_id'])
+    currency = account.currency if account is not None else DEFAULT_CURRENCY
+    return RecurringRule(
+        id=row['id'],
+        name=row['name'],
+        amount=from_minor(row['amount'], currency),
+        operation_type=OperationType(row['operation_type']),
+        account_id=row['account_id'],
+        frequency=Frequency(row['frequency']),
+        start_date=date.fromisoformat(row['start_date']),
+        interval=row['interval'],
+        category_id=row['category_id'],
+        to_account_id=row['to_account_id'],
+        notes=row['notes'],
+        end_date=_parse_date(row['end_date']),
+        last_date=_parse_date(row['last_date']),
+        is_active=bool(row['is_active'])
+    )
+
+@profile_methods
+class RecurringService:
+    """Сервис правил повторяющихся операций и их планировщик."""
+
+    def create_rule(
+        self,
+        name: str,
+        amount: Amount,
+        operation_type: OperationType,
+        account_id: int,
+        frequency: Frequency,
+        start_date: date,
+        interval: int = 1,
+        category_id: Optional[int] = None,
+        to_account_id: Optional[int] = None,
+        notes: str = "",
+        end_date: Optional[date] = None,
+    ) -> RecurringRule:
+        """Создает правило в БД. Операции по нему создает run_due()."""
+        account = accounts_cache.get(account_id)
+        if account is None:
+            raise ValueError(f"Счет с ID {account_id} не найден.")
+        if operation_type == OperationType.TRANSFER:
+            to_account = accounts_cache.get(to_account_id) if to_account_id is not None else None
+            if to_account is None:
+                raise ValueError("Для перевода нужен счет зачисления.")
+            if to_account.currency != account.currency:
+                raise ValueError("Перевод возможен только между счетами в одной валюте.")
+        if interval < 1:
+            raise ValueError("interval должен быть положительным.")
+        if end_date is not None and end_date < start_date:
+            raise ValueError("Дата окончания раньше даты начала.")
+        minor_amount = to_minor(amount, account.currency)
+        if minor_amount <= 0:
+            raise ValueError("Сумма должна быть положительной.")
+
+        with transaction() as conn:
+            cursor = conn.execute(
+                """INSERT INTO recurring_rules (name, amount, operation_type, account_id, to_account_id,
+                                                category_id, notes, frequency, interval, start_date, end_date)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (name, minor_amount, operation_type.value, account_id, to_account_id, category_id, notes,
+                 frequency.value, interval, start_date.isoformat(), end_date.isoformat() if end_date else None)
+            )
+            new_id = cursor.lastrowid
+        return RecurringRule(
+            id=new_id, name=name, amount=from_minor(minor_amount, account.currency),
+            operation_type=operation_type, account_id=account_id, frequency=frequency,
+            start_date=start_date, interval=interval, category_id=category_id,
+            to_account_id=to_account_id, notes=notes, end_date=end_date
+        )
+
+    def get_rule(self, rule_id: int) -> Optional[RecurringRule]:
+        conn = get_db_connection()
+        row = conn.execute("SELECT * FROM recurring_rules WHERE id = ?", (rule_id,)).fetchone()
+        return _row_to_rule(row) if row else None
+
+    def get_rules(self, active_only: bool = False) -> List[RecurringRule]:
+        conn = get_db_connection()
+        where = "WHERE is_active = 1" if active_only else ""
+        rows = conn.execute(f"SELECT * FROM recurring_rules {where} ORDER BY id").fetchall()
+        return [_row_to_rule(row) for row in rows]
+
+    def set_rule_active(self, rule_id: int, is_active: bool) -> bool:
+        """Приостанавливает или возобновляет правило.
+
+        Пропущенные за время паузы повторы при возобновлении тоже будут
+        созданы; чтобы их пропустить, создайте новое правило.
+        """
+        with transaction() as conn:
+            cursor = conn.execute("UPDATE recurring_rules SET is_active = ? WHERE id = ?", (is_active, rule_id))
+            updated_rows = cursor.rowcount
+        return updated_rows > 0
+
+    def delete_rule(self, rule_id: int) -> bool:
+        """Удаляет правило; уже созданные операции остаются как обычные."""
+        with transaction() as conn:
+            conn.execute("UPDATE operations SET rule_id = NULL WHERE rule_id = ?", (rule_id,))
+            cursor = conn.execute("DELETE FROM recurring_rules WHERE id = ?", (rule_id,))
+            deleted_rows = cursor.rowcount
+        return deleted_rows > 0
+
+    def run_due(self, as_of: Optional[date] = None, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """Создает все повторы активных правил, наступившие к as_of (по умолчанию сегодня).
+
+        Догоняет пропущенное с last_date каждого правила, даже если
+        приложение не запускалось годами. Все правила обрабатываются в одной
+        транзакции: повторы вставляются пачками через executemany, балансы
+        меняются одним UPDATE на счет в конце. Повторный запуск ничего не
+        дублирует: last_date сдвигается в той же транзакции, а уникальный
+        индекс (rule_id, operation_date) отбрасывает уже созданные повторы.
+        Возвращает число созданных операций.
+        """
+        as_of = as_of or date.today()
+        created = 0
+        deltas: Dict[int, int] = {}
+        with transaction() as conn:
+            rows = conn.execute(
+                """SELECT * FROM recurring_rules
+                   WHERE is_active = 1 AND start_date <= ?
+                     AND (last_date IS NULL OR last_date < ?)
+                     AND (end_date IS NULL OR last_date IS NULL OR last_date < end_date)""",
+                (as_of.isoformat(), as_of.isoformat())
+            ).fetchall()
+            for row in rows:
+                rule = _row_to_rule(row)
+                minor_amount = row['amount']
+                notes = rule.notes or rule.name
+                last_date = None
+                occurrences = rule.occurrences(rule.last_date, as_of)
+                while True:
+                    dates = list(islice(occurrences, chunk_size))
+                    if not dates:
+                        break
+                    cursor = conn.executemany(INSERT_OCCURRENCE_SQL, [
+                        (minor_amount, rule.operation_type.value, day.isoformat(), rule.category_id,
+                         rule.account_id, notes, rule.to_account_id, rule.id)
+                        for day in dates
+                    ])
+                    # Все повторы правила одинаковы, поэтому изменения балансов
+                    # считаются по числу действительно вставленных строк
+                    inserted = cursor.rowcount
+                    for account_id, delta in balance_deltas(
+                        rule.operation_type, rule.account_id, rule.to_account_id, minor_amount
+                    ):
+                        deltas[account_id] = deltas.get(account_id, 0) + delta * inserted
+                    created += inserted
+                    last_date = dates[-1]
+                if last_date is not None:
+                    conn.execute(
+                        "UPDATE recurring_rules SET last_date = ? WHERE id = ?", (last_date.isoformat(), rule.id)
+                    )
+            conn.executemany(
+                UPDATE_BALANCE_SQL, [(delta, account_id) for account_id, delta in deltas.items() if delta]
+            )
+        if deltas:
+            accounts_cache.invalidate()
+        return created
@@ -0,0 +1,250 @@
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.db.database import get_db_connection
+from app.db.profiler import profile_methods
+from app.models.money import DEFAULT_CURRENCY, currency_scale, from_minor
+from app.models.operation import OperationType
+from app.models.operation_batch import OperationBatch
+from app.services.archive_service import operation_schemas, operations_source
+from app.services.operation_service import account_currencies, operation_filters
+
+# Ключи группировки по сырым операциям: ключ отчета -> SQL.
+# Недели собираются в Python из дневных итогов, чтобы не вызывать strftime
+# на каждой строке и читать индекс по дате в порядке ключа.
+RAW_GROUPINGS = {
+    "day": "operation_date",
+    "week": "operation_date",
+    "month": "substr(operation_date, 1, 7)",
+    "year": "substr(operation_date, 1, 4)",
+    "category": "category_id",
+    "account": "account_id",
+    "type": "operation_type",
+}
+
+# Колонки операций, нужные группировкам по сырым операциям (для UNION ALL с архивами)
+RAW_COLUMNS = "operation_date, category_id, account_id, operation_type, amount"
+
+# Ключи, которые считаются по помесячным итогам monthly_totals
+ROLLUP_GROUPINGS = {
+    "month": "month",
+    "year": "substr(month, 1, 4)",
+    "category": "category_id",
+    "account": "account_id",
+    "type": "operation_type",
+}
+
+@dataclass
+class ReportTable:
+    """Компактный результат отчета: имена колонок и строки-кортежи."""
+    columns: List[str]
+    rows: List[tuple] = field(default_factory=list)
+
+    def as_dicts(self) -> List[Dict[str, object]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+@profile_methods
+class ReportService:
+    """Сервис отчетов: агрегаты считаются в SQLite через GROUP BY."""
+
+    def totals(
+        self,
+        group_by: Sequence[str] = ("month", "category"),
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        operation_type: Optional[OperationType] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> ReportTable:
+        """Возвращает доходы, расходы, сальдо и число операций по группам.
+
+        Группы по месяцам, годам, категориям, счетам и типам читаются из
+        помесячных итогов monthly_totals (в них есть и архивные годы), а
+        неполные месяцы на краях периода и группы по дням и неделям — GROUP BY
+        по покрывающему индексу операций и пересекающихся с периодом архивных
+        разделов. Суммы не смешивают валюты: валюта счета всегда
+        входит в ключ группы, поэтому пустой group_by дает общий итог по
+        каждой валюте. Фильтр по счету учитывает счет списания; переводы
+        в доходы и расходы не попадают, но учитываются в count.
+        """
+        unknown = [key for key in group_by if key not in RAW_GROUPINGS]
+        if unknown:
+            raise ValueError(f"Неизвестная группировка: {', '.join(unknown)}")
+
+        if all(key in ROLLUP_GROUPINGS for key in group_by):
+            # Целые месяцы периода берем из итогов, неполные края — из операций
+            raw_ranges, rollup_range = _split_period(date_from, date_to)
+            rows = []
+            if rollup_range is not None:
+                rows += self._rollup_rows(group_by, account_id, category_id, operation_type, *rollup_range)
+            for range_from, range_to in raw_ranges:
+                rows += self._raw_rows(group_by, account_id, category_id, operation_type, range_from, range_to)
+        else:
+            rows = self._raw_rows(group_by, account_id, category_id, operation_type, date_from, date_to)
+
+        return _build_table(group_by, rows, account_currencies())
+
+    def batch_totals(self, batch: OperationBatch, group_by: Sequence[str] = ("month", "category")) -> ReportTable:
+        """То же, что totals(), но по уже загруженному OperationBatch.
+
+        Суммы считаются по колонкам пакета без создания объектов на строку,
+        поэтому отчет по выборке get_operations_batch() не обращается к БД.
+        """
+        return _build_table(group_by, batch.grouped_rows(group_by), batch.currencies)
+
+    def _rollup_rows(self, group_by, account_id, category_id, operation_type, date_from, date_to):
+        conditions, params = [], []
+        if account_id is not None:
+            conditions.append("account_id = ?")
+            params.append(account_id)
+        if category_id is not None:
+            conditions.append("category_id = ?")
+            params.append(category_id)
+        if operation_type is not None:
+            conditions.append("operation_type = ?")
+            params.append(operation_type.value)
+        if date_from is not None:
+            conditions.append("month >= ?")
+            params.append(date_from.strftime("%Y-%m"))
+        if date_to is not None:
+            conditions.append("month <= ?")
+            params.append(date_to.strftime("%Y-%m"))
+        return self._grouped_rows(
+            "monthly_totals", [ROLLUP_GROUPINGS[key] for key in group_by], "SUM(op_count)", conditions, params
+        )
+
+    def _raw_rows(self, group_by, account_id, category_id, operation_type, date_from, date_to):
+        conditions, params = operation_filters(None, category_id, operation_type, date_from, date_to)
+        if account_id is not None:
+            conditions.append("account_id = ?")
+            params.append(account_id)
+        source = operations_source(operation_schemas(date_from, date_to), RAW_COLUMNS)
+        return self._grouped_rows(
+            source, [RAW_GROUPINGS[key] for key in group_by], "COUNT(*)", conditions, params
+        )
+
+    def _grouped_rows(self, table, expressions, count_sql, conditions, params):
+        """Группирует источник по выражениям и счету; возвращает кортежи (ключи..., счет, доход, расход, число)."""
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Дублирующиеся выражения (day и week) группируем один раз
+        unique = list(dict.fromkeys(expressions))
+        columns = [f"k{unique.index(expr)}" for expr in expressions]
+        conn = get_db_connection()
+        return conn.execute(
+            f"""SELECT {', '.join(columns + ['account_id'])}, income, expense, count FROM (
+                    SELECT {', '.join([f'{expr} AS k{i}' for i, expr in enumerate(unique)] + ['account_id'])},
+                           SUM(CASE WHEN operation_type = 'income' THEN amount ELSE 0 END) AS income,
+                           SUM(CASE WHEN operation_type = 'expense' THEN amount ELSE 0 END) AS expense,
+                           {count_sql} AS count
+                    FROM {table}
+                    {where}
+                    GROUP BY {', '.join([f'k{i}' for i in range(len(unique))] + ['account_id'])}
+                ) WHERE count > 0""",
+            params
+        ).fetchall()
+
+    def monthly_trend(
+        self,
+        window: int = 3,
+        account_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> ReportTable:
+        """Помесячная динамика: сальдо, скользящее среднее за window месяцев и изменение к прошлому месяцу.
+
+        Производные метрики считаются в Python по уже агрегированному ряду
+        (одна строка на месяц и валюту), месяцы без операций заполняются нулями.
+        """
+        if window < 1:
+            raise ValueError("window должен быть положительным.")
+        monthly = self.totals(("month",), account_id, category_id, None, date_from, date_to)
+
+        series: Dict[str, Dict[str, tuple]] = {}
+        for month, currency, income, expense, net, count in monthly.rows:
+            series.setdefault(currency, {})[month] = (income, expense, net)
+
+        table = ReportTable(columns=["month", "currency", "income", "expense", "net", "net_avg", "net_change"])
+        for currency, by_month in sorted(series.items()):
+            zero = from_minor(0, currency)
+            # Среднее округляется до минорных единиц, как и остальные суммы отчета
+            step = Decimal(1).scaleb(-currency_scale(currency))
+            nets = []
+            for month in _month_range(min(by_month), max(by_month)):
+                income, expense, net = by_month.get(month, (zero, zero, zero))
+                nets.append(net)
+                recent = nets[-window:]
+                change = net - nets[-2] if len(nets) > 1 else None
+                average = (sum(recent, zero) / len(recent)).quantize(step, rounding=ROUND_HALF_UP)
+                table.rows.append((month, currency, income, expense, net, average, change))
+        return table
+
+def _build_table(group_by: Sequence[str], rows, currencies: Dict[int, str]) -> ReportTable:
+    """Собирает таблицу отчета из строк (ключи..., счет, доход, расход, число) в минорных единицах."""
+    key_count = len(group_by)
+    groups: Dict[tuple, List[int]] = {}
+    for row in rows:
+        keys = list(row[:key_count])
+        for i, key in enumerate(group_by):
+            if key == "week":
+                year, week, _ = date.fromisoformat(keys[i]).isocalendar()
+                keys[i] = f"{year}-W{week:02d}"
+            elif key == "category" and keys[i] == 0:
+                keys[i] = None
+        group = (*keys, currencies.get(row[key_count], DEFAULT_CURRENCY))
+        totals = groups.setdefault(group, [0, 0, 0])
+        totals[0] += row[key_count + 1]
+        totals[1] += row[key_count + 2]
+        totals[2] += row[key_count + 3]
+
+    table = ReportTable(columns=[*group_by, "currency", "income", "expense", "net", "count"])
+    for group in sorted(groups, key=lambda values: [(value is not None, value) for value in values]):
+        income, expense, count = groups[group]
+        currency = group[-1]
+        table.rows.append((
+            *group,
+            from_minor(income, currency),
+            from_minor(expense, currency),
+            from_minor(income - expense, currency),
+            count,
+        ))
+    return table
+
+def _month_end(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1) - timedelta(days=1)
+
+def _split_period(
+    date_from: Optional[date], date_to: Optional[date]
+) -> Tuple[List[Tuple[date, date]], Optional[Tuple[Optional[date], Optional[date]]]]:
+    """Делит период на неполные месяцы по краям и диапазон целых месяцев между ними."""
+    if date_from is not None and date_to is not None and date_from > date_to:
+        return [], None
+    raw_ranges = []
+    start, end = date_from, date_to
+    if start is not None and start.day != 1:
+        head_end = _month_end(start)
+        if end is not None and end <= head_end:
+            return [(start, end)], None
+        raw_ranges.append((start, head_end))
+        start = head_end + timedelta(days=1)
+    if end is not None and end != _month_end(end):
+        tail_start = end.replace(day=1)
+        raw_ranges.append((tail_start, end))
+        end = tail_start - timedelta(days=1)
+    if start is not None and end is not None and start > end:
+        return raw_ranges, None
+    return raw_ranges, (start, end)
+
+def _month_range(first: str, last: str) -> List[str]:
+    """Все месяцы "YYYY-MM" от first до last включительно."""
+    year, month = int(first[:4]), int(first[5:7])
+    months = []
+    while True:
+        current = f"{year:04d}-{month:02d}"
+        months.append(current)
+        if current >= last:
+            return months
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
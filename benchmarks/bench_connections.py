@@ -0,0 +1,119 @@
+"""Сравнение пропускной способности: новое соединение на каждый запрос против пула.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_connections [--iterations N]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date
+
+from app.db import database
+from app.db.migrations import apply_migrations
+from app.models.operation import OperationType
+from app.services.account_service import AccountService
+from app.services.operation_service import OperationService
+
+
+def _fresh_connection(path):
+    """Старое поведение get_db_connection(): новое соединение без настроек."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def bench_fresh_reads(path, account_id, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        conn = _fresh_connection(path)
+        conn.execute("SELECT * FROM accounts WHERE id = ?", (account_id,)).fetchone()
+        conn.close()
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_fresh_writes(path, account_id, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        conn = _fresh_connection(path)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN TRANSACTION")
+        cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
+        cursor.execute("UPDATE accounts SET balance = balance WHERE id = ?", (account_id,))
+        cursor.execute(
+            "INSERT INTO operations (amount, operation_type, operation_date, category_id, account_id, notes) "
+            "VALUES ('1.00', 'expense', ?, 1, ?, '')",
+            (date.today().isoformat(), account_id)
+        )
+        conn.commit()
+        conn.close()
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_pooled_reads(account_id, iterations):
+    # Тот же запрос, что и в bench_fresh_reads, напрямую через соединение
+    # потока: AccountService.get_account отвечает из TableCache и измерил бы
+    # кэш, а не переиспользование соединения
+    start = time.perf_counter()
+    for _ in range(iterations):
+        database.get_db_connection().execute("SELECT * FROM accounts WHERE id = ?", (account_id,)).fetchone()
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_pooled_writes(operation_service, account_id, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation_service.add_operation(
+            amount="1.00",
+            description="",
+            account_id=account_id,
+            category_id=1,
+            operation_type=OperationType.EXPENSE,
+        )
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        database.set_database(path)
+        database.init_database()
+        account_service = AccountService()
+        operation_service = OperationService()
+        account_id = account_service.create_account("bench", "0").id
+
+        # «До» измеряем на отдельном файле с той же схемой, но без WAL
+        # и прагм — так, как работал прежний get_db_connection(). Схему
+        # создают те же миграции: копировать DDL из sqlite_master нельзя,
+        # с ним повторно создались бы служебные таблицы FTS5.
+        before_path = os.path.join(tmp, "before.db")
+        conn = _fresh_connection(before_path)
+        conn.isolation_level = None  # транзакциями миграций управляет apply_migrations
+        apply_migrations(conn)
+        conn.execute("INSERT INTO accounts (id, name, balance) VALUES (?, 'bench', 0)", (account_id,))
+        conn.commit()
+        conn.close()
+        before_reads = bench_fresh_reads(before_path, account_id, args.iterations)
+        before_writes = bench_fresh_writes(before_path, account_id, args.iterations)
+
+        after_reads = bench_pooled_reads(account_id, args.iterations)
+        after_writes = bench_pooled_writes(operation_service, account_id, args.iterations)
+        database.get_connection_manager().close_all()
+
+    print(f"{'сценарий':<12}{'до, оп/с':>14}{'после, оп/с':>14}{'ускорение':>12}")
+    for name, before, after in (
+        ("чтение", before_reads, after_reads),
+        ("запись", before_writes, after_writes),
+    ):
+        print(f"{name:<12}{before:>14.0f}{after:>14.0f}{after / before:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Замер выгрузки операций в CSV, JSON Lines и колоночный формат.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_export [--rows N]
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.db import database
+from app.models.operation import Operation, OperationType
+from app.services.account_service import AccountService
+from app.services.export_service import ColumnarReader, ExportService
+from app.services.operation_service import OperationService
+
+
+def generate_operations(account_id, rows, seed=42):
+    rnd = random.Random(seed)
+    start = date(2020, 1, 1)
+    for i in range(rows):
+        yield Operation(
+            id=None,
+            amount=f"{rnd.randrange(1, 500000) / 100:.2f}",
+            operation_type=OperationType.EXPENSE if rnd.random() < 0.85 else OperationType.INCOME,
+            operation_date=start + timedelta(days=rnd.randrange(365 * 4)),
+            category_id=None,
+            account_id=account_id,
+            notes=f"Операция {i}",
+        )
+
+
+def measure(label, rows, path, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / 1024 / 1024 if path else 0
+    print(f"{label:<22} {elapsed:6.2f} с, {rows / elapsed:9.0f} строк/с"
+          + (f", {size_mb:.0f} МБ, {size_mb / elapsed:.0f} МБ/с" if path else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_database(os.path.join(tmp, "bench.db"))
+        database.init_database()
+        account_id = AccountService().create_account("bench", "0").id
+        OperationService().add_operations_bulk(generate_operations(account_id, args.rows))
+        export_service = ExportService()
+
+        paths = {name: os.path.join(tmp, f"operations.{name}") for name in ("csv", "jsonl", "ftcol")}
+
+        def export_csv():
+            with open(paths["csv"], "w", encoding="utf-8", newline="") as stream:
+                export_service.export_csv(stream)
+
+        def export_jsonl():
+            with open(paths["jsonl"], "w", encoding="utf-8") as stream:
+                export_service.export_jsonl(stream)
+
+        def export_columnar():
+            with open(paths["ftcol"], "wb") as stream:
+                export_service.export_columnar(stream)
+
+        def read_columnar():
+            with ColumnarReader(paths["ftcol"]) as reader:
+                sum(sum(batch.amounts) for batch in reader.batches())
+
+        measure("CSV", args.rows, paths["csv"], export_csv)
+        measure("JSON Lines", args.rows, paths["jsonl"], export_jsonl)
+        measure("колоночный", args.rows, paths["ftcol"], export_columnar)
+        measure("чтение колонок (mmap)", args.rows, None, read_columnar)
+        database.get_connection_manager().close_all()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"пик RSS: {peak_mb:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Замер потокового импорта CSV-выписки через add_operations_bulk.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_import [--rows N] [--chunk-size N]
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.db import database
+from app.services.account_service import AccountService
+from app.services.import_service import iter_csv_operations
+from app.services.operation_service import BULK_CHUNK_SIZE, OperationService
+
+
+def write_statement(path, rows, seed=42):
+    """Генерирует CSV-выписку в формате банка: дата;сумма;описание;категория."""
+    rnd = random.Random(seed)
+    start = date(2020, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("date;amount;description;category\n")
+        for i in range(rows):
+            day = start + timedelta(days=rnd.randrange(365 * 4))
+            amount = rnd.randrange(1, 500000) / 100
+            if rnd.random() < 0.85:
+                amount = -amount
+            f.write(f"{day:%d.%m.%Y};{amount:.2f};Операция {i};\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "statement.csv")
+        write_statement(csv_path, args.rows)
+
+        database.set_database(os.path.join(tmp, "bench.db"))
+        database.init_database()
+        account_id = AccountService().create_account("bench", "0").id
+        operation_service = OperationService()
+
+        start = time.perf_counter()
+        with open(csv_path, newline="", encoding="utf-8") as stream:
+            inserted = operation_service.add_operations_bulk(
+                iter_csv_operations(stream, account_id, default_category_id=1),
+                chunk_size=args.chunk_size,
+            )
+        elapsed = time.perf_counter() - start
+        database.get_connection_manager().close_all()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"строк: {inserted}, время: {elapsed:.2f} с, {inserted / elapsed:.0f} строк/с, "
+          f"пик RSS: {peak_mb:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
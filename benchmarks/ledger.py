@@ -0,0 +1,214 @@
+"""Генератор синтетических журналов операций для бенчмарков.
+
+Журнал воспроизводим: при одинаковых LedgerSpec (включая seed) получаются
+одинаковые счета, категории и операции. Операции распределены неравномерно:
+недавние даты встречаются чаще (skew), немногие счета и категории собирают
+большую часть операций (распределение Ципфа), суммы расходов — логнормальные,
+зарплата приходит раз в месяц.
+
+Запуск из корня репозитория создает файл БД с журналом:
+
+    python -m benchmarks.ledger finance-bench.db [--operations N] [--accounts N] [--seed N]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from itertools import accumulate, cycle
+from typing import Iterator, List
+
+from app.db import database
+from app.models.category import OperationType
+from app.models.operation import Operation
+from app.services.account_service import AccountService
+from app.services.category_service import CategoryService
+from app.services.operation_service import OperationService
+
+INCOME_CATEGORIES = ("Зарплата", "Премия", "Проценты по вкладу", "Кэшбэк", "Подарки")
+EXPENSE_CATEGORIES = (
+    "Продукты", "Кафе", "Транспорт", "Аренда", "Связь", "Подписки", "Одежда", "Здоровье",
+    "Развлечения", "Коммунальные услуги", "Такси", "Путешествия", "Образование", "Дом", "Подарки близким",
+)
+MERCHANTS = (
+    "Пятёрочка", "Перекрёсток", "Магнит", "ВкусВилл", "Азбука вкуса", "Шоколадница", "Кофе Хауз",
+    "Яндекс Такси", "Метро", "МТС", "Билайн", "Netflix", "Спортмастер", "Аптека Ригла", "Лента",
+    "ИКЕА", "Леруа Мерлен", "Ozon", "Wildberries", "Аэрофлот", "Кинотеатр Октябрь", "Теремок",
+)
+NOTE_TEMPLATES = (
+    "{merchant}", "Покупка в {merchant}", "{merchant}, оплата картой", "Оплата {merchant} онлайн",
+    "{merchant} — {category}", "",
+)
+
+
+@dataclass
+class LedgerSpec:
+    """Параметры синтетического журнала."""
+    operations: int = 100_000
+    accounts: int = 5
+    categories: int = 20
+    start: date = date(2015, 1, 1)
+    end: date = date(2024, 12, 31)
+    # Чем больше skew, тем сильнее операции смещены к концу периода (1 — равномерно)
+    skew: float = 2.0
+    transfer_share: float = 0.05
+    income_share: float = 0.08
+    seed: int = 42
+
+    def as_dict(self) -> dict:
+        return {key: value.isoformat() if isinstance(value, date) else value for key, value in asdict(self).items()}
+
+
+@dataclass
+class Ledger:
+    """Созданный журнал: id счетов и категорий для сценариев бенчмарков."""
+    spec: LedgerSpec
+    account_ids: List[int]
+    income_category_ids: List[int]
+    expense_category_ids: List[int]
+
+
+def _zipf_weights(count: int) -> List[float]:
+    return list(accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+def iter_operations(spec: LedgerSpec, ledger: Ledger) -> Iterator[Operation]:
+    """Поток операций журнала; даты не упорядочены, как при реальном импорте."""
+    rnd = random.Random(spec.seed)
+    days = (spec.end - spec.start).days
+    accounts = ledger.account_ids
+    account_weights = _zipf_weights(len(accounts))
+    expense_weights = _zipf_weights(len(ledger.expense_category_ids))
+    category_names = dict(zip(ledger.expense_category_ids, cycle(EXPENSE_CATEGORIES)))
+    transfer_limit = spec.transfer_share if len(accounts) > 1 else 0
+    income_limit = transfer_limit + spec.income_share
+
+    for _ in range(spec.operations):
+        operation_date = spec.start + timedelta(days=int(days * (1 - rnd.random() ** spec.skew)))
+        account_id = rnd.choices(accounts, cum_weights=account_weights)[0]
+        kind = rnd.random()
+        if kind < transfer_limit:
+            to_account_id = rnd.choice([acc for acc in accounts if acc != account_id])
+            yield Operation(
+                id=None, amount=f"{rnd.randrange(100, 50000)}.00", operation_type=OperationType.TRANSFER,
+                operation_date=operation_date, category_id=None, account_id=account_id,
+                notes="Перевод между счетами", to_account_id=to_account_id,
+            )
+        elif kind < income_limit:
+            category_id = rnd.choice(ledger.income_category_ids)
+            yield Operation(
+                id=None, amount=f"{rnd.randrange(5000, 150000)}.{rnd.randrange(100):02d}",
+                operation_type=OperationType.INCOME, operation_date=operation_date,
+                category_id=category_id, account_id=account_id, notes="Поступление",
+            )
+        else:
+            category_id = rnd.choices(ledger.expense_category_ids, cum_weights=expense_weights)[0]
+            amount = min(rnd.lognormvariate(6.5, 1.2), 500000)
+            template = rnd.choice(NOTE_TEMPLATES)
+            yield Operation(
+                id=None, amount=f"{amount:.2f}", operation_type=OperationType.EXPENSE,
+                operation_date=operation_date, category_id=category_id, account_id=account_id,
+                notes=template.format(merchant=rnd.choice(MERCHANTS), category=category_names[category_id]),
+            )
+
+
+def iter_salaries(spec: LedgerSpec, ledger: Ledger) -> Iterator[Operation]:
+    """Ежемесячная зарплата на основной счет."""
+    year, month = spec.start.year, spec.start.month
+    while date(year, month, 1) <= spec.end:
+        yield Operation(
+            id=None, amount="150000.00", operation_type=OperationType.INCOME,
+            operation_date=min(date(year, month, 25), spec.end),
+            category_id=ledger.income_category_ids[0], account_id=ledger.account_ids[0], notes="Зарплата",
+        )
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def generate_ledger(spec: LedgerSpec) -> Ledger:
+    """Заполняет текущую БД журналом по spec через сервисы приложения."""
+    account_service = AccountService()
+    category_service = CategoryService()
+    income_count = max(1, min(len(INCOME_CATEGORIES), spec.categories // 4))
+    expense_count = max(1, spec.categories - income_count)
+
+    account_ids = [
+        account_service.create_account(f"Счет {i + 1}", "100000.00").id for i in range(spec.accounts)
+    ]
+    income_ids = [
+        category_service.create_category(INCOME_CATEGORIES[i], OperationType.INCOME).id
+        for i in range(income_count)
+    ]
+    expense_ids = [
+        category_service.create_category(
+            EXPENSE_CATEGORIES[i % len(EXPENSE_CATEGORIES)] + (f" {i // len(EXPENSE_CATEGORIES) + 1}"
+                                                              if i >= len(EXPENSE_CATEGORIES) else ""),
+            OperationType.EXPENSE,
+        ).id
+        for i in range(expense_count)
+    ]
+    ledger = Ledger(spec, account_ids, income_ids, expense_ids)
+
+    operation_service = OperationService()
+    operation_service.add_operations_bulk(iter_salaries(spec, ledger))
+    operation_service.add_operations_bulk(iter_operations(spec, ledger))
+    return ledger
+
+
+def open_ledger(path: str, spec: LedgerSpec) -> Ledger:
+    """Открывает журнал из файла path или создает его, если файла нет или spec другой.
+
+    Рядом с БД хранится path.json с параметрами журнала: большие журналы
+    (миллионы строк) генерируются один раз и переиспользуются между прогонами.
+    """
+    meta_path = f"{path}.json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["spec"] == spec.as_dict():
+            database.set_database(path)
+            database.init_database()
+            return Ledger(spec, meta["account_ids"], meta["income_category_ids"], meta["expense_category_ids"])
+
+    for stale in (path, f"{path}-wal", f"{path}-shm", meta_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+    database.set_database(path)
+    database.init_database()
+    ledger = generate_ledger(spec)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "spec": spec.as_dict(),
+            "account_ids": ledger.account_ids,
+            "income_category_ids": ledger.income_category_ids,
+            "expense_category_ids": ledger.expense_category_ids,
+        }, f, ensure_ascii=False, indent=2)
+    return ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--operations", type=int, default=LedgerSpec.operations)
+    parser.add_argument("--accounts", type=int, default=LedgerSpec.accounts)
+    parser.add_argument("--categories", type=int, default=LedgerSpec.categories)
+    parser.add_argument("--skew", type=float, default=LedgerSpec.skew)
+    parser.add_argument("--seed", type=int, default=LedgerSpec.seed)
+    args = parser.parse_args()
+
+    spec = LedgerSpec(
+        operations=args.operations, accounts=args.accounts, categories=args.categories,
+        skew=args.skew, seed=args.seed,
+    )
+    start = time.perf_counter()
+    ledger = open_ledger(args.path, spec)
+    database.get_connection_manager().close_all()
+    print(f"журнал: {spec.operations} операций, {len(ledger.account_ids)} счетов, "
+          f"{len(ledger.income_category_ids) + len(ledger.expense_category_ids)} категорий, "
+          f"{time.perf_counter() - start:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
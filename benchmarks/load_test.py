@@ -0,0 +1,273 @@
+"""Нагрузочный тест JSON API (app.api.server): запросы в секунду и задержки p50/p99.
+
+Клиент на asyncio держит --concurrency постоянных (keep-alive) соединений,
+каждое из которых шлет запросы подряд в течение --duration секунд. Набор
+запросов задается --mix: имена сценариев через запятую с весами, например
+"accounts:2,operations.page:5,operations.search:1". Ответы 503 считаются
+отдельно: это сервер отказал из-за перегрузки пула.
+
+С --spawn сервер запускается отдельным процессом на копии синтетического
+журнала из кэша benchmarks.ledger (клиент и сервер не делят один GIL);
+иначе запросы идут на уже работающий сервер --url.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.load_test --spawn [--operations N] [--workers 4] [--concurrency 32] [--duration 10]
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 [--mix ...] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from app.db import database
+from benchmarks.ledger import LedgerSpec, open_ledger
+from benchmarks.suite import DEFAULT_CACHE_DIR, environment
+
+DEFAULT_MIX = "accounts:2,accounts.etag:2,categories:1,operations.page:4,operations.filtered:2,operations.search:1"
+
+STARTUP_TIMEOUT = 30  # секунды на запуск сервера с --spawn
+REQUEST_TIMEOUT = 30
+
+
+def build_scenarios(ledger) -> Dict[str, Tuple[str, str, Optional[dict]]]:
+    """Сценарии: имя -> (метод, путь, тело JSON или None)."""
+    account_id = ledger.account_ids[0] if ledger else 1
+    category_id = ledger.expense_category_ids[0] if ledger else 1
+    return {
+        "accounts": ("GET", "/api/accounts", None),
+        # Условный запрос: после первого ответа клиент шлет If-None-Match
+        "accounts.etag": ("GET", "/api/accounts", None),
+        "categories": ("GET", "/api/categories?type=expense", None),
+        "operations.page": ("GET", "/api/operations?limit=50", None),
+        "operations.filtered": ("GET", f"/api/operations?limit=50&accountId={account_id}", None),
+        "operations.search": ("GET", f"/api/operations/search?q={quote('оплата')}&limit=20", None),
+        "balance": ("GET", f"/api/accounts/{account_id}/balance", None),
+        "operations.add": ("POST", "/api/operations", {
+            "type": "expense", "amount": "1.00", "accountId": account_id, "categoryId": category_id,
+            "note": "нагрузочный тест",
+        }),
+    }
+
+
+def parse_mix(mix: str, scenarios: Dict[str, tuple]) -> List[str]:
+    """Разворачивает "имя:вес,..." в список имен, из которого сценарии выбираются случайно."""
+    names = []
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name not in scenarios:
+            raise SystemExit(f"Неизвестный сценарий {name}; доступны: {', '.join(scenarios)}")
+        names.extend([name] * int(weight or 1))
+    return names
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.bytes = 0
+
+    def add(self, name: str, status: int, seconds: float, size: int):
+        self.latencies.setdefault(name, []).append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes += size
+
+    def summary(self, elapsed: float) -> dict:
+        def describe(values: List[float]) -> dict:
+            values = sorted(values)
+            return {
+                "requests": len(values),
+                "requests_per_sec": len(values) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": (values[-1] if values else 0.0) * 1000,
+            }
+        everything = [value for values in self.latencies.values() for value in values]
+        return {
+            "total": describe(everything),
+            "scenarios": {name: describe(values) for name, values in sorted(self.latencies.items())},
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": self.errors,
+            "bytes_received": self.bytes,
+            "seconds": elapsed,
+        }
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+
+async def client(host: str, port: int, scenarios: dict, names: List[str], deadline: float,
+                 stats: Stats, seed: int):
+    """Одно keep-alive-соединение, шлющее запросы подряд до deadline."""
+    rng = random.Random(seed)
+    etags: Dict[str, str] = {}
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        name = rng.choice(names)
+        method, path, payload = scenarios[name]
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Accept-Encoding: gzip",
+                 f"Content-Length: {len(body)}"]
+        if body:
+            lines.append("Content-Type: application/json")
+        if name.endswith(".etag") and name in etags:
+            lines.append(f"If-None-Match: {etags[name]}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status, headers, response_body = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        stats.add(name, status, time.perf_counter() - start, len(response_body))
+        if "etag" in headers:
+            etags[name] = headers["etag"]
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(host: str, port: int, scenarios: dict, names: List[str], concurrency: int,
+                   duration: float, seed: int) -> dict:
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        client(host, port, scenarios, names, deadline, stats, seed + i) for i in range(concurrency)
+    ))
+    return stats.summary(time.perf_counter() - start)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(host: str, port: int, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Сервер завершился с кодом {process.returncode}")
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("Сервер не запустился вовремя")
+
+
+def print_summary(summary: dict):
+    print(f"{'сценарий':<24}{'запросов':>10}{'запр./с':>10}{'p50, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    rows = [*summary["scenarios"].items(), ("всего", summary["total"])]
+    for name, result in rows:
+        print(f"{name:<24}{result['requests']:>10}{result['requests_per_sec']:>10.0f}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}")
+    statuses = ", ".join(f"{status}: {count}" for status, count in summary["statuses"].items())
+    print(f"статусы: {statuses}; ошибок соединения: {summary['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="адрес работающего сервера")
+    parser.add_argument("--spawn", action="store_true", help="запустить сервер на синтетическом журнале")
+    parser.add_argument("--operations", type=int, default=100_000, help="размер журнала для --spawn")
+    parser.add_argument("--seed", type=int, default=LedgerSpec.seed)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=4, help="потоков БД сервера для --spawn")
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных соединений")
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд нагрузки")
+    parser.add_argument("--warmup", type=float, default=1.0, help="секунд прогрева перед замером")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="сценарии с весами: имя:вес,...")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    ledger = None
+    process = None
+    tmp = None
+    if args.spawn:
+        spec = LedgerSpec(operations=args.operations, seed=args.seed)
+        os.makedirs(args.cache_dir, exist_ok=True)
+        cached_path = os.path.join(args.cache_dir, f"ledger-{spec.operations}-{spec.accounts}-{spec.seed}.db")
+        ledger = open_ledger(cached_path, spec)
+        database.get_connection_manager().close_all()
+        tmp = tempfile.mkdtemp()
+        work_path = os.path.join(tmp, "ledger.db")
+        shutil.copyfile(cached_path, work_path)
+        host, port = "127.0.0.1", free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.api.server", "--host", host, "--port", str(port),
+             "--workers", str(args.workers), "--database", work_path],
+            stdout=subprocess.DEVNULL,
+        )
+        wait_for_port(host, port, process)
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+
+    scenarios = build_scenarios(ledger)
+    names = parse_mix(args.mix, scenarios)
+    try:
+        if args.warmup > 0:
+            asyncio.run(run_load(host, port, scenarios, names, args.concurrency, args.warmup, args.seed))
+        summary = asyncio.run(run_load(host, port, scenarios, names, args.concurrency, args.duration, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print_summary(summary)
+    results = {
+        "environment": environment(),
+        "target": f"http://{host}:{port}",
+        "ledger": ledger.spec.as_dict() if ledger else None,
+        "options": {"concurrency": args.concurrency, "duration": args.duration, "mix": args.mix,
+                    "workers": args.workers if args.spawn else None},
+        "results": summary,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Многопроцессный стресс-тест: параллельные записи не теряют изменения балансов.
+
+Несколько процессов одновременно проводят доходы, расходы и переводы по
+одним и тем же счетам. В конце итоговые балансы сверяются с суммой
+проведенных операций. При потерянном обновлении скрипт завершится с кодом 1.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.stress_balance [--processes N] [--operations N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app.db import database
+from app.models.operation import OperationType
+from app.services.account_service import AccountService
+from app.services.operation_service import OperationService
+
+INITIAL_BALANCE = 1000
+
+
+def worker(path, account_ids, operations, seed):
+    database.set_database(path)
+    service = OperationService()
+    first, second = account_ids
+    for i in range(operations):
+        step = (seed + i) % 3
+        if step == 0:
+            service.add_operation("1.00", "", first, 1, OperationType.INCOME)
+        elif step == 1:
+            service.add_operation("0.50", "", second, 1, OperationType.EXPENSE)
+        else:
+            service.transfer("0.25", first, second)
+    database.get_connection_manager().close_all()
+
+
+def expected_balances(processes, operations):
+    """Ожидаемые балансы в копейках, посчитанные без БД."""
+    first = second = INITIAL_BALANCE * 100
+    for seed in range(processes):
+        for i in range(operations):
+            step = (seed + i) % 3
+            if step == 0:
+                first += 100
+            elif step == 1:
+                second -= 50
+            else:
+                first -= 25
+                second += 25
+    return first, second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stress.db")
+        database.set_database(path)
+        database.init_database()
+        account_service = AccountService()
+        account_ids = (
+            account_service.create_account("first", str(INITIAL_BALANCE)).id,
+            account_service.create_account("second", str(INITIAL_BALANCE)).id,
+        )
+        database.get_connection_manager().close_all()
+
+        start = time.perf_counter()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, account_ids, args.operations, seed))
+            for seed in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [p.exitcode for p in processes if p.exitcode != 0]
+        database.set_database(path)
+        actual = tuple(
+            database.get_db_connection().execute("SELECT balance FROM accounts WHERE id = ?", (account_id,)).fetchone()[0]
+            for account_id in account_ids
+        )
+        count = database.get_db_connection().execute("SELECT COUNT(*) FROM operations").fetchone()[0]
+        database.get_connection_manager().close_all()
+
+    expected = expected_balances(args.processes, args.operations)
+    total = args.processes * args.operations
+    print(f"процессов: {args.processes}, операций: {count}/{total}, "
+          f"{total / elapsed:.0f} оп/с, балансы: {actual}, ожидалось: {expected}")
+    if failed or actual != expected or count != total:
+        print("ОШИБКА: потеряны изменения или упали процессы", file=sys.stderr)
+        sys.exit(1)
+    print("OK: потерянных обновлений нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Набор бенчмарков сервисов на синтетическом журнале с результатами в JSON.
+
+Каждый сценарий повторяется несколько раз; в JSON пишутся минимальное,
+медианное и p95 время, операции в секунду и окружение (коммит git, версии
+Python и SQLite). Журнал берется из кэша benchmarks.ledger и копируется во
+временный файл, поэтому сценарии записи не меняют журнал между прогонами.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.suite [--operations N] [--output results.json] [--compare baseline.json]
+        [--only ШАБЛОН] [--repeat N]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List, Tuple
+
+from app.db import database
+from app.db.worker import DbWorker
+from app.models.category import OperationType
+from app.services.account_service import AccountService
+from app.services.category_service import CategoryService
+from app.services.operation_service import OperationService
+from app.services.report_service import ReportService
+from benchmarks.ledger import Ledger, LedgerSpec, iter_operations, open_ledger
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "finance-tracker-bench")
+
+# Сценарии, которые читают всю историю, на больших журналах пропускаются
+FULL_SCAN_LIMIT = 2_000_000
+
+# Единицы, в которых сценарии считают обработанные элементы (items в JSON):
+# вызовы сервиса, строки (операции, счета, строки отчета) или страницы.
+# items_per_sec сравнимы только между сценариями с одной единицей.
+CALLS, ROWS, PAGES = "calls", "rows", "pages"
+
+# Бенчмарк: (имя, число повторов по умолчанию, единица, функция, возвращающая число обработанных элементов)
+Benchmark = Tuple[str, int, str, Callable[[], int]]
+
+
+def build_benchmarks(ledger: Ledger, worker: DbWorker) -> List[Benchmark]:
+    accounts = AccountService()
+    categories = CategoryService()
+    operations = OperationService()
+    reports = ReportService()
+    account_id = ledger.account_ids[0]
+    second_account_id = ledger.account_ids[-1]
+    category_id = ledger.expense_category_ids[0]
+    spec = ledger.spec
+    recent_from = date(spec.end.year, 1, 1)
+
+    def through_worker(func, *args, **kwargs):
+        # Путь обновления GUI: задача уходит в DbWorker, результат забирается
+        # из очереди так же, как это делает опрос after() в FinanceApp
+        results = []
+        worker.submit(func, *args, callback=results.append, errback=results.append, **kwargs)
+        while not results:
+            worker.process_results()
+            time.sleep(0.0002)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        return results[0]
+
+    def single_inserts(count=100):
+        for i in range(count):
+            operations.add_operation("123.45", f"Бенчмарк {i}", account_id, category_id, OperationType.EXPENSE,
+                                     spec.end)
+        return count
+
+    def bulk_insert(count=10_000):
+        bulk_spec = LedgerSpec(operations=count, seed=spec.seed + 1, start=spec.start, end=spec.end)
+        return operations.add_operations_bulk(iter_operations(bulk_spec, ledger))
+
+    def first_pages(count=50):
+        for _ in range(count):
+            operations.get_operations_page(limit=200)
+        return count
+
+    def deep_pages(count=20):
+        # Страницы подряд по курсору, как при долгой прокрутке истории
+        cursor = None
+        for _ in range(count):
+            _, cursor = operations.get_operations_page(cursor, limit=200)
+        return count
+
+    def filtered_pages(count=50):
+        for _ in range(count):
+            operations.get_operations_page(limit=200, account_id=second_account_id, date_from=recent_from)
+            operations.get_operations_page(limit=200, category_id=category_id)
+        return 2 * count
+
+    def balance_reads(count=200):
+        for i in range(count):
+            accounts.get_balance_as_of(account_id, date.fromordinal(recent_from.toordinal() - i * 7))
+        return count
+
+    benchmarks: List[Benchmark] = [
+        ("account.get_account", 5, CALLS, lambda: sum(1 for _ in range(10_000) if accounts.get_account(account_id))),
+        ("account.get_all_accounts", 5, ROWS, lambda: sum(len(accounts.get_all_accounts()) for _ in range(10_000))),
+        ("account.get_balance_as_of", 5, CALLS, balance_reads),
+        ("category.get_categories_by_type", 5, ROWS,
+         lambda: sum(len(categories.get_categories_by_type(OperationType.EXPENSE)) for _ in range(10_000))),
+        ("operation.add_operation", 5, ROWS, single_inserts),
+        ("operation.transfer", 5, ROWS,
+         lambda: sum(1 for _ in range(100) if operations.transfer("10.00", account_id, second_account_id))),
+        ("operation.add_operations_bulk", 3, ROWS, bulk_insert),
+        ("operation.page.first", 5, PAGES, first_pages),
+        ("operation.page.deep", 5, PAGES, deep_pages),
+        ("operation.page.filtered", 5, PAGES, filtered_pages),
+        ("operation.by_account.limit", 5, ROWS,
+         lambda: sum(len(operations.get_operations_by_account(second_account_id, limit=100)) for _ in range(50))),
+        ("operation.search", 5, ROWS, lambda: sum(len(operations.search("оплата карт", limit=50)) for _ in range(20))),
+        ("report.totals.month_category", 5, ROWS, lambda: len(reports.totals(("month", "category")).rows)),
+        ("report.totals.day", 3, ROWS, lambda: len(reports.totals(("day",), date_from=recent_from).rows)),
+        ("gui.refresh_accounts", 5, ROWS, lambda: sum(len(through_worker(accounts.get_all_accounts)) for _ in range(100))),
+        ("gui.refresh_operations", 5, ROWS,
+         lambda: sum(len(through_worker(operations.get_operations_page, None, limit=200)[0]) for _ in range(20))),
+        ("gui.refresh_comboboxes", 5, CALLS, lambda: sum(
+            1 for _ in range(100) if through_worker(lambda: (accounts.get_all_accounts(), categories.get_all_categories()))
+        )),
+    ]
+    if spec.operations <= FULL_SCAN_LIMIT:
+        benchmarks += [
+            ("operation.get_all_operations", 3, ROWS, lambda: len(operations.get_all_operations())),
+            ("operation.get_operations_batch", 3, ROWS, lambda: len(operations.get_operations_batch())),
+            ("operation.by_account.all", 3, ROWS, lambda: len(operations.get_operations_by_account(account_id))),
+        ]
+    return benchmarks
+
+
+def run_benchmark(func: Callable[[], int], repeat: int, unit: str) -> Dict[str, float]:
+    timings, items = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "repeat": repeat,
+        "items": items,
+        "unit": unit,
+        "min": timings[0],
+        "median": median,
+        "p95": timings[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))],
+        "max": timings[-1],
+        "items_per_sec": items / median if median else 0.0,
+    }
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["benchmarks"]
+    print(f"\nсравнение с {baseline_path} (медиана, < 1 — быстрее):")
+    for name, result in results["benchmarks"].items():
+        if name in baseline and baseline[name]["median"]:
+            ratio = result["median"] / baseline[name]["median"]
+            mark = "  <-- медленнее" if ratio > 1.1 else ""
+            print(f"  {name:<34} {ratio:6.2f}x{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=100_000, help="размер журнала (10k–10M)")
+    parser.add_argument("--accounts", type=int, default=LedgerSpec.accounts)
+    parser.add_argument("--seed", type=int, default=LedgerSpec.seed)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="где хранить сгенерированные журналы")
+    parser.add_argument("--only", default="*", help="шаблон имен сценариев, например 'operation.*'")
+    parser.add_argument("--repeat", type=int, help="число повторов вместо значения по умолчанию")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    spec = LedgerSpec(operations=args.operations, accounts=args.accounts, seed=args.seed)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    cached_path = os.path.join(args.cache_dir, f"ledger-{spec.operations}-{spec.accounts}-{spec.seed}.db")
+    start = time.perf_counter()
+    ledger = open_ledger(cached_path, spec)
+    database.get_connection_manager().close_all()
+    print(f"журнал {cached_path}: {time.perf_counter() - start:.1f} с")
+
+    results = {"environment": environment(), "ledger": spec.as_dict(), "benchmarks": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_path = os.path.join(tmp, "ledger.db")
+        shutil.copyfile(cached_path, work_path)
+        database.set_database(work_path)
+
+        print(f"{'сценарий':<34}{'медиана, мс':>12}{'p95, мс':>10}{'элем./с':>12}  единица")
+        worker = DbWorker()
+        try:
+            for name, repeat, unit, func in build_benchmarks(ledger, worker):
+                if not fnmatch.fnmatch(name, args.only):
+                    continue
+                result = run_benchmark(func, args.repeat or repeat, unit)
+                results["benchmarks"][name] = result
+                print(f"{name:<34}{result['median'] * 1000:>12.2f}{result['p95'] * 1000:>10.2f}"
+                      f"{result['items_per_sec']:>12.0f}  {unit}")
+        finally:
+            worker.stop()
+            database.get_connection_manager().close_all()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"результаты: {args.output}")
+    else:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
-from app.db.database import create_tables
+from app.db.database import init_database
 
 if __name__ == "__main__":
-    create_tables()
+    version = init_database()
+    print(f"Схема базы данных актуальна (версия {version}).")
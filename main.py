@@ -2,7 +2,7 @@
 from datetime import date
 from decimal import Decimal
 
-from app.db.database import create_tables
+from app.db.database import init_database
 from app.models.category import OperationType
 from app.services.account_service import AccountService
 from app.services.category_service import CategoryService
@@ -10,24 +10,21 @@ from app.services.operation_service import OperationService
 
 def main():
     """Главная функция приложения: демонстрация работы сервисов."""
-    # 1. Убедимся, что таблицы в БД созданы
-    create_tables()
+    # 1. Приведем схему БД к актуальной версии
+    init_database()
     print("--- Инициализация сервисов ---")
     
     # 2. Инициализация сервисов
     account_service = AccountService()
     category_service = CategoryService()
-    operation_service = OperationService(account_service, category_service)
+    operation_service = OperationService()
     print("Сервисы успешно инициализированы.")
 
     # 3. Очистим старые данные для чистоты демонстрации (не для продакшена!)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM operations")
-    cursor.execute("DELETE FROM accounts")
-    cursor.execute("DELETE FROM categories")
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM operations")
+        conn.execute("DELETE FROM accounts")
+        conn.execute("DELETE FROM categories")
     print("--- Старые данные удалены для чистоты демонстрации ---")
 
     # 4. Создание категорий
@@ -44,27 +41,31 @@ def main():
     # 6. Выполнение операций
     print("\n--- Проведение операций ---")
     # Поступление зарплаты на карту
-    operation_service.create_operation(
+    operation_service.add_operation(
         amount="50000.00",
-        operation_date=date(2024, 7, 25),
-        category_id=cat_salary.id,
+        description="Аванс",
         account_id=acc_card.id,
-        notes="Аванс"
+        category_id=cat_salary.id,
+        operation_type=OperationType.INCOME,
+        operation_date=date(2024, 7, 25)
     )
     # Покупка продуктов наличными
-    operation_service.create_operation(
+    operation_service.add_operation(
         amount="1250.50",
-        operation_date=date(2024, 7, 26),
-        category_id=cat_food.id,
+        description="Продукты на неделю",
         account_id=acc_cash.id,
-        notes="Продукты на неделю"
+        category_id=cat_food.id,
+        operation_type=OperationType.EXPENSE,
+        operation_date=date(2024, 7, 26)
     )
     # Поход в кафе с оплатой картой
-    operation_service.create_operation(
+    operation_service.add_operation(
         amount="780.00",
-        operation_date=date(2024, 7, 27),
+        description="",
+        account_id=acc_card.id,
         category_id=cat_cafe.id,
-        account_id=acc_card.id
+        operation_type=OperationType.EXPENSE,
+        operation_date=date(2024, 7, 27)
     )
 
     # 7. Вывод итоговой информации
@@ -79,5 +80,5 @@ def main():
         print(f"Дата: {op.operation_date}, Сумма: {op.amount}, Заметки: {op.notes}")
 
 if __name__ == "__main__":
-    from app.db.database import get_db_connection # Локальный импорт
+    from app.db.database import transaction # Локальный импорт
     main()